@@ -0,0 +1,65 @@
+"""
+Time create_drawdowns() on a million-point equity curve. The previous
+element-by-element implementation (reproduced below) is timed on a
+shorter curve and scaled up, since it takes minutes at full size.
+
+Run from the repository root:
+
+    python benchmarks/bench_drawdowns.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from mikasa.performance import create_drawdowns, create_worst_drawdown
+
+POINTS = 1000000
+LOOP_POINTS = 20000
+
+
+def loop_drawdowns(equity_curve):
+    hwm = [0]
+    eq_idx = equity_curve.index
+    drawdown = pd.Series(np.nan, index=eq_idx)
+    duration = pd.Series(np.nan, index=eq_idx)
+    for t in range(1, len(eq_idx)):
+        cur_hwm = max(hwm[t - 1], equity_curve.iloc[t])
+        hwm.append(cur_hwm)
+        drawdown.iloc[t] = hwm[t] - equity_curve.iloc[t]
+        duration.iloc[t] = 0 if drawdown.iloc[t] == 0 else duration.iloc[t - 1] + 1
+    return drawdown.max(), duration.max()
+
+
+def equity_curve(points):
+    np.random.seed(7)
+    index = pd.date_range('2017-04-22', periods=points, freq='5min')
+    returns = np.random.normal(0.0, 0.001, points)
+    curve = pd.Series((1.0 + returns).cumprod(), index=index)
+    curve.iloc[0] = np.nan
+    return curve
+
+
+if __name__ == "__main__":
+    short = equity_curve(LOOP_POINTS)
+    start = time.time()
+    expected = loop_drawdowns(short)
+    loop_time = (time.time() - start) * POINTS / LOOP_POINTS
+    assert create_drawdowns(short) == expected
+
+    curve = equity_curve(POINTS)
+    start = time.time()
+    max_dd, dd_duration = create_drawdowns(curve)
+    vectorized_time = time.time() - start
+    _, dd_start, dd_end = create_worst_drawdown(curve)
+
+    print("loop (scaled from %d points): %8.2f s" % (LOOP_POINTS, loop_time))
+    print("vectorized (%d points):     %8.3f s" % (POINTS, vectorized_time))
+    print("speedup:                          %8.0fx" % (loop_time / vectorized_time))
+    print("max drawdown %.4f over %d periods, worst %s -> %s" % (max_dd, dd_duration, dd_start, dd_end))
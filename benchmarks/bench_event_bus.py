@@ -0,0 +1,63 @@
+"""
+Events/second pushed through the backtest loop's drain pattern for
+queue.Queue (get(False) until queue.Empty) and DequeEventBus (poll()
+until None). Each tick puts a few events and drains the bus, like one
+MARKET -> SIGNAL -> ORDER -> FILL cascade.
+
+Run from the repository root:
+
+    python benchmarks/bench_event_bus.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from mikasa.event import DequeEventBus, QueueEventBus, MarketEvent
+
+TICKS = 200000
+EVENTS_PER_TICK = 4
+
+
+def drain_queue(events):
+    event = MarketEvent(market_data={})
+    start = time.time()
+    for _ in range(TICKS):
+        for _ in range(EVENTS_PER_TICK):
+            events.put(event)
+        while True:
+            try:
+                events.get(False)
+            except queue.Empty:
+                break
+    return TICKS * EVENTS_PER_TICK / (time.time() - start)
+
+
+def drain_bus(events):
+    event = MarketEvent(market_data={})
+    start = time.time()
+    for _ in range(TICKS):
+        for _ in range(EVENTS_PER_TICK):
+            events.put(event)
+        e = events.poll()
+        while e is not None:
+            e = events.poll()
+    return TICKS * EVENTS_PER_TICK / (time.time() - start)
+
+
+if __name__ == "__main__":
+    before = drain_queue(queue.Queue())
+    live = drain_bus(QueueEventBus())
+    after = drain_bus(DequeEventBus())
+    print("queue.Queue + Empty:  %10.0f events/s" % before)
+    print("QueueEventBus.poll:   %10.0f events/s" % live)
+    print("DequeEventBus.poll:   %10.0f events/s" % after)
+    print("speedup:              %10.1fx" % (after / before))
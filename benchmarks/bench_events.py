@@ -0,0 +1,140 @@
+"""
+Per-event overhead of building and routing events through the backtest
+loop: the previous plain classes (per-instance __dict__, string type
+set in __init__) routed by an if/elif chain on the type string, against
+the slotted events routed by the dispatch table on type_id, with and
+without MarketEvent recycling. Each tick is one MARKET -> SIGNAL ->
+ORDER -> FILL cascade.
+
+Run from the repository root:
+
+    python benchmarks/bench_events.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from mikasa.event import FillEvent, MarketEvent, MarketEventPool, OrderEvent, SignalEvent
+
+TICKS = 200000
+
+
+class PlainMarketEvent:
+    type = 'MARKET'
+
+    def __init__(self, market_data):
+        self.market_data = market_data
+
+
+class PlainSignalEvent:
+    def __init__(self, strategy_id, symbol, datetime, signal_type, strength):
+        self.type = 'SIGNAL'
+        self.strategy_id = strategy_id
+        self.symbol = symbol
+        self.datetime = datetime
+        self.signal_type = signal_type
+        self.strength = strength
+
+
+class PlainOrderEvent:
+    def __init__(self, symbol, order_type, quantity, direction, price=None):
+        self.type = 'ORDER'
+        self.symbol = symbol
+        self.order_type = order_type
+        self.quantity = quantity
+        self.direction = direction
+        self.price = price
+
+
+class PlainFillEvent:
+    def __init__(self, timeindex, symbol, exchange, quantity, direction, price, commission=None):
+        self.type = 'FILL'
+        self.timeindex = timeindex
+        self.symbol = symbol
+        self.exchange = exchange
+        self.quantity = quantity
+        self.direction = direction
+        self.price = price
+        self.commission = 0.002 if commission is None else commission
+
+
+class Counter(object):
+    def __init__(self):
+        self.counts = [0, 0, 0, 0]
+
+    def on_market(self, event):
+        self.counts[0] += 1
+
+    def on_signal(self, event):
+        self.counts[1] += 1
+
+    def on_order(self, event):
+        self.counts[2] += 1
+
+    def on_fill(self, event):
+        self.counts[3] += 1
+
+
+def run_chain():
+    counter = Counter()
+    market_data = {}
+
+    def process(event):
+        if event.type == 'MARKET':
+            counter.on_market(event)
+        elif event.type == 'SIGNAL':
+            counter.on_signal(event)
+        elif event.type == 'ORDER':
+            counter.on_order(event)
+        elif event.type == 'FILL':
+            counter.on_fill(event)
+
+    start = time.time()
+    for _ in range(TICKS):
+        process(PlainMarketEvent(market_data))
+        process(PlainSignalEvent('BNH', 'BTC_ETH', None, 'LONG', 1.0))
+        process(PlainOrderEvent('BTC_ETH', 'MKT', 1.0, 'BUY'))
+        process(PlainFillEvent(None, 'BTC_ETH', 'BACKTEST', 1.0, 'BUY', 1.0))
+    return time.time() - start
+
+
+def run_dispatch(pool=None):
+    counter = Counter()
+    market_data = {}
+    dispatch = [counter.on_market, counter.on_signal, counter.on_order, counter.on_fill]
+
+    def process(event):
+        dispatch[event.type_id](event)
+
+    start = time.time()
+    for _ in range(TICKS):
+        if pool is None:
+            market = MarketEvent(market_data)
+        else:
+            market = pool.get(market_data)
+        process(market)
+        if pool is not None:
+            pool.release(market)
+        process(SignalEvent('BNH', 'BTC_ETH', None, 'LONG', 1.0))
+        process(OrderEvent('BTC_ETH', 'MKT', 1.0, 'BUY'))
+        process(FillEvent(None, 'BTC_ETH', 'BACKTEST', 1.0, 'BUY', 1.0))
+    return time.time() - start
+
+
+if __name__ == "__main__":
+    events = 4 * TICKS
+    chain = run_chain()
+    dispatch = run_dispatch()
+    pooled = run_dispatch(MarketEventPool())
+
+    print("plain events, if/elif on type:  %6.0f ns/event" % (chain / events * 1e9))
+    print("slotted events, dispatch table: %6.0f ns/event" % (dispatch / events * 1e9))
+    print("  + MarketEvent recycling:      %6.0f ns/event" % (pooled / events * 1e9))
+    print("instance size: %d bytes with __dict__, %d slotted" % (
+        sys.getsizeof(PlainFillEvent(None, 'A', 'B', 1.0, 'BUY', 1.0)) +
+        sys.getsizeof(PlainFillEvent(None, 'A', 'B', 1.0, 'BUY', 1.0).__dict__),
+        sys.getsizeof(FillEvent(None, 'A', 'B', 1.0, 'BUY', 1.0))))
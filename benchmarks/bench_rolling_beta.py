@@ -0,0 +1,104 @@
+"""
+Time rolling_sm_ols() and rolling_beta() of examples/utils.py on
+100k-point series against the statsmodels and sklearn refits they
+replaced (reproduced below). The refits are timed on a shorter series
+and scaled up, since they take minutes at full size.
+
+Run from the repository root:
+
+    python benchmarks/bench_rolling_beta.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+from sklearn import linear_model
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'examples'))
+
+from utils import rolling_beta, rolling_sm_ols
+
+POINTS = 100000
+LOOP_POINTS = 5000
+WINDOW = 100
+
+
+def loop_sm_ols(Y, X, indexes, window=100):
+    out_dates = []
+    out_beta = []
+
+    for iStart in range(0, len(X) - window):
+        iEnd = iStart + window
+
+        _x = X[iStart:iEnd].values.reshape(-1, 1)
+        _y = Y[iStart:iEnd].values.reshape(-1, 1)
+
+        results = sm.OLS(_y, _x).fit()
+
+        # store output
+        out_dates.append(indexes[iEnd])
+        out_beta.append(results.params[0])
+
+    return pd.DataFrame({'beta': out_beta}, index=out_dates)
+
+
+def loop_beta(X, y, idx, window=100):
+    assert len(X) == len(y)
+
+    out_dates = []
+    out_beta = []
+
+    model_ols = linear_model.LinearRegression()
+
+    for iStart in range(0, len(X) - window):
+        iEnd = iStart + window
+
+        _x = X[iStart:iEnd].values.reshape(-1, 1)
+        _y = y[iStart:iEnd].values.reshape(-1, 1)
+
+        model_ols.fit(_x, _y)
+
+        # store output
+        out_dates.append(idx[iEnd])
+        out_beta.append(model_ols.coef_[0][0])
+
+    return pd.DataFrame({'beta': out_beta}, index=out_dates)
+
+
+def series(points):
+    np.random.seed(7)
+    index = pd.date_range('2017-04-22', periods=points, freq='5min')
+    x = pd.Series(np.exp(np.cumsum(np.random.normal(0.0, 0.001, points))), index=index)
+    y = 0.5 * x + np.random.normal(0.0, 0.01, points)
+    return x, y
+
+
+if __name__ == "__main__":
+    # rolling_sm_ols takes (Y, X), rolling_beta takes (X, y)
+    for name, loop, vectorized, swap in (('rolling_sm_ols', loop_sm_ols, rolling_sm_ols, True),
+                                         ('rolling_beta', loop_beta, rolling_beta, False)):
+        x, y = series(LOOP_POINTS)
+        args = (y, x) if swap else (x, y)
+        start = time.time()
+        expected = loop(args[0], args[1], x.index, WINDOW)
+        loop_time = (time.time() - start) * POINTS / LOOP_POINTS
+        result = vectorized(args[0], args[1], x.index, WINDOW)
+        assert list(result.index) == list(expected.index)
+        np.testing.assert_allclose(result['beta'], expected['beta'], rtol=1e-6)
+
+        x, y = series(POINTS)
+        args = (y, x) if swap else (x, y)
+        start = time.time()
+        vectorized(args[0], args[1], x.index, WINDOW)
+        vectorized_time = time.time() - start
+
+        print(name)
+        print("  loop (scaled from %d points): %8.2f s" % (LOOP_POINTS, loop_time))
+        print("  cumulative sums (%d points): %8.4f s" % (POINTS, vectorized_time))
+        print("  speedup:                       %8.0fx" % (loop_time / vectorized_time))
@@ -0,0 +1,96 @@
+"""
+Time SimulatedExecutionHandler.check_stop_orders() with hundreds of
+resting stop orders spread over many pairs, against the previous scan of
+every order times every symbol (reproduced below, without the
+remove-while-iterating skip so both fill the same orders). Both put
+their fills on an event bus, which is drained to count them.
+
+Run from the repository root:
+
+    python benchmarks/bench_stop_orders.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from mikasa.event import DequeEventBus, FillEvent, MarketEvent, OrderEvent
+from mikasa.execution import SimulatedExecutionHandler
+
+SYMBOLS = 50
+ORDERS = 500
+TICKS = 5000
+
+
+class Bar(object):
+    def __init__(self, close):
+        self.close = close
+
+
+class ScanExecutionHandler(SimulatedExecutionHandler):
+    def __init__(self, events, portfolio):
+        super(ScanExecutionHandler, self).__init__(events, portfolio)
+        self.resting = []
+
+    def add_stop_order(self, order):
+        self.resting.append(order)
+
+    def check_stop_orders(self, event):
+        if event.type == 'MARKET':
+            for order in list(self.resting):
+                for s in event.market_data:
+                    if order.symbol == s:
+                        if event.market_data[s].close > order.price and order.direction == 'BUY':
+                            fill_event = FillEvent(order.datetime, order.symbol,
+                                                   'BACKTEST', order.quantity, order.direction, order.price)
+                            self.events.put(fill_event)
+                            self.resting.remove(order)
+                        if event.market_data[s].close < order.price and order.direction == 'SELL':
+                            fill_event = FillEvent(order.datetime, order.symbol,
+                                                   'BACKTEST', order.quantity, order.direction, order.price)
+                            self.events.put(fill_event)
+                            self.resting.remove(order)
+
+
+def run(handler_cls):
+    np.random.seed(7)
+    symbols = ['PAIR_%d' % i for i in range(SYMBOLS)]
+    closes = np.exp(np.cumsum(np.random.normal(0.0, 0.002, (TICKS, SYMBOLS)), axis=0))
+    events = [MarketEvent(market_data=dict((s, Bar(c)) for s, c in zip(symbols, row))) for row in closes]
+
+    bus = DequeEventBus()
+    handler = handler_cls(bus, None)
+    for i in range(ORDERS):
+        # Stops 2-30% away from the opening price
+        direction = 'BUY' if i % 2 else 'SELL'
+        offset = np.random.uniform(0.02, 0.3)
+        price = 1.0 + offset if direction == 'BUY' else 1.0 - offset
+        order = OrderEvent(symbols[i % SYMBOLS], 'STP', 1.0, direction, price)
+        order.datetime = None
+        handler.add_stop_order(order)
+
+    start = time.time()
+    for event in events:
+        handler.check_stop_orders(event)
+    elapsed = time.time() - start
+
+    fills = 0
+    while bus.poll() is not None:
+        fills += 1
+    return elapsed, fills
+
+
+if __name__ == "__main__":
+    scan_time, scan_fills = run(ScanExecutionHandler)
+    book_time, book_fills = run(SimulatedExecutionHandler)
+    assert scan_fills == book_fills
+
+    print("%d stops over %d pairs, %d ticks, %d fills" % (ORDERS, SYMBOLS, TICKS, book_fills))
+    print("scan:       %8.3f s" % scan_time)
+    print("stop book:  %8.3f s" % book_time)
+    print("speedup:    %8.0fx" % (scan_time / book_time))
@@ -0,0 +1,88 @@
+"""
+Bars/second of HistoricCSVDataHandler.update_bars() over the test
+datasets, compared with the previous iterrows()-based implementation
+(reproduced below) which re-created a generator per symbol per tick.
+
+Run from the repository root:
+
+    python benchmarks/bench_update_bars.py
+"""
+from __future__ import print_function
+
+import datetime
+import os
+import sys
+import time
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from mikasa.data import DataPoint, HistoricCSVDataHandler
+
+CSV_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'datasets')
+SYMBOL_LIST = ['BTC_ETC', 'BTC_LTC']
+FIELDS = ['open', 'high', 'low', 'close']
+
+
+class IterrowsDataHandler(object):
+    def __init__(self, events, csv_dir, symbol_list):
+        self.events = events
+        self.symbol_list = symbol_list
+        self.symbol_data = {}
+        self.latest_symbol_data = {}
+        self.continue_backtest = True
+
+        comb_index = None
+        for s in symbol_list:
+            self.symbol_data[s] = pd.read_csv(os.path.join(csv_dir, '%s.csv' % s), header=0, index_col=0)
+            if comb_index is None:
+                comb_index = self.symbol_data[s].index
+            self.latest_symbol_data[s] = []
+        for s in symbol_list:
+            self.symbol_data[s] = self.symbol_data[s].reindex(index=comb_index, method='pad').iterrows()
+
+    def _get_new_bar(self, symbol):
+        for b in self.symbol_data[symbol]:
+            yield DataPoint({
+                'symbol': symbol,
+                'datetime': datetime.datetime.fromtimestamp(b[0]),
+                'timestamp': b[0],
+                'open': b[1].open,
+                'high': b[1].high,
+                'low': b[1].low,
+                'close': b[1].close,
+            })
+
+    def update_bars(self):
+        for s in self.symbol_list:
+            try:
+                bar = next(self._get_new_bar(s))
+            except StopIteration:
+                self.continue_backtest = False
+            else:
+                self.latest_symbol_data[s].append(bar)
+        self.events.put(self.latest_symbol_data)
+
+
+def run(handler):
+    bars = 0
+    start = time.time()
+    while handler.continue_backtest:
+        handler.update_bars()
+        handler.events.get(False)
+        bars += len(handler.symbol_list)
+    return bars / (time.time() - start)
+
+
+if __name__ == "__main__":
+    before = run(IterrowsDataHandler(queue.Queue(), CSV_DIR, SYMBOL_LIST))
+    after = run(HistoricCSVDataHandler(queue.Queue(), CSV_DIR, SYMBOL_LIST, FIELDS))
+    print("iterrows handler:  %10.0f bars/s" % before)
+    print("bar store cursor:  %10.0f bars/s" % after)
+    print("speedup:           %10.1fx" % (after / before))
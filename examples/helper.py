@@ -9,6 +9,17 @@ Created on Mon Jul 10 12:45:51 2017
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def make_windows(data, seq_len):
+    """ Windows of seq_len + 1 consecutive points, one per row
+    Input: 1-D data (array or memmap), sequence length
+    Output: Read-only view of shape (len(data) - seq_len - 1, seq_len + 1)
+
+    Note: Rows are strided views into data, nothing is copied
+    """
+    return sliding_window_view(np.asarray(data), seq_len + 1)[:-1]
 
 
 def normalize_windows(win_data):
@@ -21,11 +32,8 @@ def normalize_windows(win_data):
     Note: Normalization data using n_i = (p_i / p_0) - 1,
     denormalization using p_i = p_0(n_i + 1)
     """
-    norm_data = []
-    for w in win_data:
-        norm_win = [((float(p) / float(w[0])) - 1) for p in w]
-        norm_data.append(norm_win)
-    return norm_data
+    win_data = np.asarray(win_data, dtype=np.float64)
+    return win_data / win_data[:, :1] - 1
 
 
 def load_data(filename, seq_len, norm_win):
@@ -41,27 +49,65 @@ def load_data(filename, seq_len, norm_win):
     Note: Run from timeSeriesPredict.py
     """
     data = pd.read_csv(filename, index_col=0, header=0)
-    data = data['close'].values
-    sequence_length = seq_len + 1
-    out = []
-    for i in range(len(data) - sequence_length):
-        out.append(data[i: i + sequence_length])
+    out = make_windows(data['close'].values, seq_len)
     if norm_win:
         out = normalize_windows(out)
-    out = np.array(out)
     split_ratio = 0.9
-    split = round(split_ratio * out.shape[0])
-    train = out[:int(split), :]
-    np.random.shuffle(train)
+    split = int(round(split_ratio * out.shape[0]))
+    # Shuffling copies the training windows, test windows stay as they are
+    train = out[np.random.permutation(split)]
     X_tr = train[:, :-1]
     Y_tr = train[:, -1]
-    X_te = out[int(split):, :-1]
-    Y_te = out[int(split):, -1]
+    X_te = out[split:, :-1]
+    Y_te = out[split:, -1]
     X_tr = np.reshape(X_tr, (X_tr.shape[0], X_tr.shape[1], 1))
     X_te = np.reshape(X_te, (X_te.shape[0], X_te.shape[1], 1))
     return [X_tr, Y_tr, X_te, Y_te]
 
 
+def window_batches(data, seq_len, batch_size, norm_win=True, shuffle=False):
+    """ Lazily yields batches of windows, shaped as load_data() returns them
+    Input: 1-D data (array or memmap), sequence length, batch size,
+    normalization window(True, False), shuffle(True, False)
+    Output: Generator of (X, Y), X of shape (batch, seq_len, 1)
+
+    Note: Only the windows of the current batch are read and normalized,
+    so training can stream from a memory-mapped bar file, e.g. the column
+    mikasa.data.load_bars(filename)[1]['close']. Yields one pass over
+    the data.
+    """
+    windows = make_windows(data, seq_len)
+    order = np.random.permutation(len(windows)) if shuffle else None
+    for start in range(0, len(windows), batch_size):
+        if order is None:
+            batch = windows[start:start + batch_size]
+        else:
+            batch = windows[order[start:start + batch_size]]
+        if norm_win:
+            batch = normalize_windows(batch)
+        yield batch[:, :-1, None], batch[:, -1]
+
+
+def rollout(model, windows, pred_len):
+    """
+    Predicts pred_len steps ahead of every window at once, feeding each
+    prediction back as the newest point of its window
+    Input: keras model, windows of shape (n, win_size, features), prediction length
+    Output: Predictions of shape (n, pred_len)
+
+    Note: Windows slide over one preallocated buffer, so each step is a
+    single batched predict on a view and nothing is reallocated
+    """
+    n, win_size, features = windows.shape
+    buf = np.empty((n, win_size + pred_len, features), dtype=np.float64)
+    buf[:, :win_size] = windows
+    predicted = np.empty((n, pred_len))
+    for j in range(pred_len):
+        predicted[:, j] = model.predict(buf[:, j:j + win_size])[:, 0]
+        buf[:, win_size + j] = predicted[:, j, None]
+    return predicted
+
+
 def predict_seq_mul(model, data, win_size, pred_len):
     """
     Predicts multiple sequences
@@ -70,16 +116,8 @@ def predict_seq_mul(model, data, win_size, pred_len):
 
     Note: Run from timeSeriesPredict.py
     """
-    pred_seq = []
-    for i in range(len(data)//pred_len):
-        current = data[i * pred_len]
-        predicted = []
-        for j in range(pred_len):
-            predicted.append(model.predict(current[None, :, :])[0, 0])
-            current = current[1:]
-            current = np.insert(current, [win_size - 1], predicted[-1], axis=0)
-        pred_seq.append(predicted)
-    return pred_seq
+    starts = data[:len(data) // pred_len * pred_len:pred_len]
+    return rollout(model, starts[:, -win_size:], pred_len).tolist()
 
 
 def predict_pt_pt(model, data):
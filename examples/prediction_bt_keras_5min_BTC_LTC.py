@@ -11,7 +11,7 @@ import numpy as np
 np.random.seed(7)
 
 import pandas as pd
-from mikasa.strategy import Strategy
+from mikasa.strategy import PredictionStrategy
 from mikasa.event import SignalEvent, OrderEvent
 from mikasa.backtest import Backtest
 from mikasa.data import HistoricCSVDataHandler
@@ -51,13 +51,13 @@ class NaiveStopPortfolio(NaivePortfolio):
         return order
 
 
-class PredictStrategy(Strategy):
-    def __init__(self, bars, events):
-        self.bars = bars
-        self.symbol_list = self.bars.symbol_list
-        self.events = events
+class PredictStrategy(PredictionStrategy):
+    lag = 18
+    window = lag + 1
+    fields = ['timestamp', 'close', 'volume']
 
-        self.lag = 18
+    def __init__(self, bars, events):
+        super(PredictStrategy, self).__init__(bars, events)
 
         csv_dir = '../datasets/5min/'
         df = pd.read_csv(os.path.join(csv_dir, self.symbol_list[0] + '.csv'), index_col=0)
@@ -86,43 +86,29 @@ class PredictStrategy(Strategy):
 
         self.model = keras.models.load_model('../research/keras_5min_lag_18_BTC_LTC.h5')
 
-    def calculate_signals(self, event):
-        if event.type == 'MARKET':
-            dt = self.bars.get_latest_bars_values(self.symbol_list[0], 'datetime')[0]
-
-            X_dt = self.bars.get_latest_bars_values(self.symbol_list[0], 'datetime', N=self.lag + 1)
-            X_close = self.bars.get_latest_bars_values(self.symbol_list[0], 'close', N=self.lag + 1)
-            X_vol = self.bars.get_latest_bars_values(self.symbol_list[0], 'volume', N=self.lag + 1)
-
-            if len(X_dt) == self.lag + 1:
-
-                df = pd.DataFrame(list(zip(X_dt, X_close, X_vol)), columns=['datetime', 'close', 'volume'])
-                df.set_index('datetime', inplace=True)
-
-                df['datetime'] = pd.to_datetime(df.index, unit='s')
-                df['hour'] = df['datetime'].dt.hour
-                df['dow'] = df['datetime'].dt.weekday
-                df = pd.get_dummies(df, columns=['dow', 'hour'])
-                missing_columns = set(self.dow_fields + self.hour_fields) - set(df.columns)
-                for c in missing_columns:
-                    df[c] = pd.Series(0, index=df.index)
-
-                for lg in range(1, self.lag + 1):
-                    df['close-' + str(lg)] = df['close'] - df.shift(lg)['close']
-                    df['volume-' + str(lg)] = df['volume'] - df.shift(lg)['volume']
-                df.dropna(inplace=True)
-                df.drop(['datetime', 'close', 'volume'], inplace=True, axis=1)
-
-                X = df[self.close_fields + self.volume_fields + self.dow_fields + self.hour_fields].values
-                X = self.scaler.transform(X)
-
-                prediction = self.model.predict(X)[0]
-                if prediction[1] > 0.7:
-                    signal = SignalEvent(1, self.symbol_list[0], dt, 'LONG', 1.0)
-                    self.events.put(signal)
-                if prediction[0] > 0.7:
-                    signal = SignalEvent(1, self.symbol_list[0], dt, 'EXIT', 1.0)
-                    self.events.put(signal)
+    def make_features(self, windows):
+        close = windows['close']
+        volume = windows['volume']
+        X_close = [close[:, -1] - close[:, -1 - lag] for lag in range(1, self.lag + 1)]
+        X_vol = [volume[:, -1] - volume[:, -1 - lag] for lag in range(1, self.lag + 1)]
+
+        # One-hot weekday and hour (UTC) of the latest bar, in the order of the dummy columns
+        timestamp = windows['timestamp'][:, -1]
+        dow = (timestamp // 86400 + 3) % 7
+        hour = timestamp // 3600 % 24
+        X_dow = dow[:, None] == np.array([int(c.split('_')[1]) for c in self.dow_fields])
+        X_hour = hour[:, None] == np.array([int(c.split('_')[1]) for c in self.hour_fields])
+
+        X = np.column_stack(X_close + X_vol + [X_dow, X_hour]).astype(np.float64)
+        return self.scaler.transform(X)
+
+    def on_prediction(self, symbol, dt, prediction):
+        if prediction[1] > 0.7:
+            signal = SignalEvent(1, symbol, dt, 'LONG', 1.0)
+            self.queue.put(signal)
+        if prediction[0] > 0.7:
+            signal = SignalEvent(1, symbol, dt, 'EXIT', 1.0)
+            self.queue.put(signal)
 
 
 if __name__ == "__main__":
@@ -11,7 +11,7 @@ import pandas as pd
 
 np.random.seed(7)
 
-from mikasa.strategy import Strategy
+from mikasa.strategy import PredictionStrategy
 from mikasa.event import SignalEvent, OrderEvent
 from mikasa.backtest import Backtest
 from mikasa.data import HistoricCSVDataHandler
@@ -51,13 +51,12 @@ class NaiveStopPortfolio(NaivePortfolio):
         return order
 
 
-class PredictStrategy(Strategy):
-    def __init__(self, bars, events):
-        self.bars = bars
-        self.symbol_list = self.bars.symbol_list
-        self.events = events
+class PredictStrategy(PredictionStrategy):
+    lag = 12
+    window = lag + 1
 
-        self.lag = 12
+    def __init__(self, bars, events):
+        super(PredictStrategy, self).__init__(bars, events)
 
         csv_dir = '../datasets/5min/'
 
@@ -76,25 +75,18 @@ class PredictStrategy(Strategy):
 
         self.model = keras.models.load_model('../research/keras_5min_btc_eth.h5')
 
-    def calculate_signals(self, event):
-        if event.type == 'MARKET':
-            dt = self.bars.get_latest_bars_values(self.symbol_list[0], 'datetime')[0]
-
-            X = self.bars.get_latest_bars_values(self.symbol_list[0], 'close', N=self.lag + 1)
-            if len(X) == self.lag + 1:
-                df = pd.DataFrame(X, columns=['close'])
-                for lag in range(1, self.lag + 1):
-                    df['close-' + str(lag)] = df['close'] - df.shift(lag)['close']
-                df.dropna(inplace=True)
-                X = df[self.close_fields].values
-                X = self.scaler.transform(X)
-                prediction = self.model.predict(X)[0]
-                if prediction[1] > 0.7:
-                    signal = SignalEvent(1, self.symbol_list[0], dt, 'LONG', 1.0)
-                    self.events.put(signal)
-                if prediction[0] > 0.7:
-                    signal = SignalEvent(1, self.symbol_list[0], dt, 'EXIT', 1.0)
-                    self.events.put(signal)
+    def make_features(self, windows):
+        close = windows['close']
+        X = np.column_stack([close[:, -1] - close[:, -1 - lag] for lag in range(1, self.lag + 1)])
+        return self.scaler.transform(X)
+
+    def on_prediction(self, symbol, dt, prediction):
+        if prediction[1] > 0.7:
+            signal = SignalEvent(1, symbol, dt, 'LONG', 1.0)
+            self.queue.put(signal)
+        if prediction[0] > 0.7:
+            signal = SignalEvent(1, symbol, dt, 'EXIT', 1.0)
+            self.queue.put(signal)
 
 
 if __name__ == "__main__":
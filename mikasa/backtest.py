@@ -1,13 +1,34 @@
 from __future__ import print_function
 import matplotlib.pyplot as plt
 import pprint
-
-try:
-    import Queue as queue
-except ImportError:
-    import queue
 import time
 
+from .event import DequeEventBus, MarketEventPool
+
+
+class ReplayScheduler(object):
+    """
+    Paces a historic run at speed times real time using the bar
+    timestamps, so CSV history can stand in for a live feed. The first
+    bar is released immediately and every later bar once its offset
+    from the first one, divided by speed, has elapsed on the wall clock.
+    """
+    def __init__(self, speed=1.0, clock=time.time, sleep=time.sleep):
+        self.speed = float(speed)
+        self.clock = clock
+        self.sleep = sleep
+
+        self._origin = None
+
+    def wait(self, timestamp):
+        now = self.clock()
+        if self._origin is None:
+            self._origin = (timestamp, now)
+            return
+        due = self._origin[1] + (timestamp - self._origin[0]) / self.speed
+        if due > now:
+            self.sleep(due - now)
+
 
 class Backtest(object):
     def __init__(self,
@@ -22,13 +43,25 @@ class Backtest(object):
                  strategy,
                  fields,
                  ticks_limit=None,
-                 verbose=0
+                 verbose=0,
+                 event_bus=DequeEventBus,
+                 scheduler=None,
+                 strategy_params=None,
+                 bar_store=None,
+                 end_date=None,
+                 execution_params=None,
+                 portfolio_params=None,
+                 recycle_events=False,
+                 filter_dates=False,
+                 data_handler_params=None
                  ):
         self.csv_dir = csv_dir
         self.symbol_list = symbol_list
         self.initial_capital = initial_capital
         self.heartbeat = heartbeat
         self.start_date = start_date
+        self.end_date = end_date
+        self.filter_dates = filter_dates
 
         self.data_handler_cls = data_handler
         self.fields = fields
@@ -36,39 +69,80 @@ class Backtest(object):
         self.portfolio_cls = portfolio
         self.strategy_cls = strategy
         self.ticks_limit = ticks_limit
+        self.strategy_params = strategy_params or {}
+        self.execution_params = execution_params or {}
+        self.portfolio_params = portfolio_params or {}
+        self.data_handler_params = data_handler_params or {}
+        self.bar_store = bar_store
 
         self.verbose = verbose
+        self.scheduler = scheduler
 
-        self.events = queue.Queue()
+        self.events = event_bus()
+        # With recycle_events one MarketEvent is reused for every bar and
+        # released as soon as _on_market returns: handlers must not keep
+        # a MarketEvent past their call, it would show the next bar's data
+        self.event_pool = MarketEventPool() if recycle_events else None
         self.signals = 0
         self.orders = 0
         self.fills = 0
         self.num_strats = 1
         self._generate_trading_instances()
+        self.data_handler.event_pool = self.event_pool
+
+        # Handlers indexed by EventType, built here so subclasses that
+        # override _generate_trading_instances() still get them
+        self._dispatch = [self._on_market, self._on_signal, self._on_order, self._on_fill]
+        self._fills = []
 
     def _generate_trading_instances(self):
+        data_handler_params = {'limit': self.ticks_limit}
+        data_handler_params.update(self._date_bounds())
+        if self.bar_store is not None:
+            data_handler_params['bar_store'] = self.bar_store
+        data_handler_params.update(self.data_handler_params)
         self.data_handler = self.data_handler_cls(self.events, self.csv_dir,
-                                                  self.symbol_list, self.fields, limit=self.ticks_limit)
-        self.strategy = self.strategy_cls(self.data_handler, self.events)
+                                                  self.symbol_list, self.fields, **data_handler_params)
+        self.strategy = self.strategy_cls(self.data_handler, self.events, **self.strategy_params)
         self.portfolio = self.portfolio_cls(self.data_handler, self.events,
                                             self.start_date,
-                                            self.initial_capital)
-        self.execution_handler = self.execution_handler_cls(self.events, self.portfolio)
+                                            self.initial_capital,
+                                            **self.portfolio_params)
+        self.execution_handler = self.execution_handler_cls(self.events, self.portfolio,
+                                                            **self.execution_params)
+
+    def _date_bounds(self):
+        """
+        Date keyword arguments for the data handler. start_date alone only
+        labels the first holdings row; the bars are filtered by date only
+        when an end_date is given or filter_dates is set.
+        """
+        if self.end_date is None and not self.filter_dates:
+            return {}
+        return {'start_date': self.start_date, 'end_date': self.end_date}
+
+    def _on_market(self, event):
+        self.strategy.calculate_signals(event)
+        self.execution_handler.check_stop_orders(event)
+        self.portfolio.update_timeindex(event)
+        if self.event_pool is not None:
+            self.event_pool.release(event)
+
+    def _on_signal(self, event):
+        self.signals += 1
+        self.portfolio.update_signal(event)
+
+    def _on_order(self, event):
+        self.orders += 1
+        self.execution_handler.execute_order(event)
+
+    def _on_fill(self, event):
+        # Booked together once the tick's events are drained
+        self.fills += 1
+        self._fills.append(event)
 
     def _process_event(self, event):
-        if event.type == 'MARKET':
-            self.strategy.calculate_signals(event)
-            self.execution_handler.check_stop_orders(event)
-            self.portfolio.update_timeindex(event)
-        elif event.type == 'SIGNAL':
-            self.signals += 1
-            self.portfolio.update_signal(event)
-        elif event.type == 'ORDER':
-            self.orders += 1
-            self.execution_handler.execute_order(event)
-        elif event.type == 'FILL':
-            self.fills += 1
-            self.portfolio.update_fill(event)
+        self._dispatch[event.type_id](event)
 
     def _run_backtest(self):
         if self.verbose > 0:
@@ -79,17 +153,22 @@ class Backtest(object):
             else:
                 break
 
-            while True:
-                try:
-                    event = self.events.get(False)
-                    if self.verbose > 0:
-                        print('Got new event: {}'.format(event.__class__.__name__))
-                except queue.Empty:
-                    break
-                else:
-                    if event is not None:
-                        self._process_event(event)
-            time.sleep(self.heartbeat)
+            if self.scheduler is not None:
+                self.scheduler.wait(self.data_handler.get_latest_timestamp())
+
+            event = self.events.poll()
+            while event is not None:
+                if self.verbose > 0:
+                    print('Got new event: {}'.format(event.__class__.__name__))
+                self._process_event(event)
+                event = self.events.poll()
+            if self._fills:
+                self.portfolio.update_fills(self._fills)
+                self._fills = []
+
+            # Historic data needs no pacing, only live feeds wait for the next poll
+            if self.data_handler.live and self.heartbeat:
+                time.sleep(self.heartbeat)
 
     def _output_performance(self):
         self.portfolio.create_equity_curve_dataframe()
@@ -128,4 +207,17 @@ class Backtest(object):
         plt.grid(True)
 
         # Plot the figure
-        plt.show()
\ No newline at end of file
+        plt.show()
+
+
+class VectorizedBacktest(Backtest):
+    """
+    Runs strategies that implement calculate_positions() without the
+    event loop: positions for the whole history are requested once and
+    a VectorizedPortfolio turns them into the equity curve. Output is
+    the same as Backtest with NaivePortfolio for the same strategy.
+    """
+    def _run_backtest(self):
+        if self.verbose > 0:
+            print('Start vectorized backtesting...')
+        self.portfolio.update_positions(self.strategy.calculate_positions())
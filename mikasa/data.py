@@ -1,10 +1,15 @@
+import asyncio
 import datetime
+import heapq
 import os, os.path
+import time
+import numpy as np
 import pandas as pd
-
-from poloniex import Poloniex
+import requests
 
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 from .event import MarketEvent
 
@@ -23,9 +28,448 @@ class DataPoint:
         return self.dt[key]
 
 
+class BarView(DataPoint):
+    """
+    Lazy DataPoint over a single bar held in a BarStore. Values are
+    read from the store columns on attribute access, so no per-bar
+    dict is built unless to_dict() is called.
+    """
+    def __init__(self, store, symbol, index):
+        self._store = store
+        self._index = index
+        self.symbol = symbol
+
+    @property
+    def dt(self):
+        return self.to_dict()
+
+    def to_dict(self):
+        return self._store.get_bar_dict(self.symbol, self._index)
+
+    def __getattr__(self, key):
+        if key.startswith('_'):
+            raise AttributeError(key)
+        return self._store.get_value(self.symbol, key, self._index)
+
+    def __eq__(self, other):
+        if isinstance(other, BarView):
+            return (self._store is other._store and
+                    self.symbol == other.symbol and
+                    self._index == other._index)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        return hash((id(self._store), self.symbol, self._index))
+
+
+class BarStore(object):
+    """
+    Columnar storage of bars: one contiguous float64 array per field
+    and an int64 timestamp array per symbol, plus a cursor marking how
+    many bars have been released to the backtest so far.
+
+    Historic data is loaded in full and revealed by advance(); live
+    feeds grow the arrays with append(). Windows returned by
+    get_latest_values() are views into the store and must not be
+    modified by the caller.
+
+    depth (an int, or a dict of symbol -> int) bounds the history that
+    get_latest_values() and get_latest_bars() reach back to. Appended
+    bars of a symbol with a depth go to a fixed ring buffer instead of
+    growing arrays, so a live feed runs in constant memory: every bar is
+    written twice, at i and i + depth of a 2 * depth array, which keeps
+    the latest depth bars contiguous and their windows views. Bars and
+    views older than depth are overwritten as the ring wraps.
+    """
+    MIN_CAPACITY = 1024
+
+    def __init__(self, symbol_list, depth=None):
+        self.symbol_list = symbol_list
+
+        self.timestamps = {}
+        self.columns = {}
+        self.length = {}
+        self.cursor = {}
+        # symbol -> bars streamed so far; unlike cursor it keeps growing
+        # when a ring buffer wraps
+        self.count = {}
+        for s in symbol_list:
+            self.set_bars(s, np.empty(0, dtype=np.int64), {})
+
+        # symbol -> bars appended to its ring buffer so far
+        self.ring_count = {}
+        self.set_depth(depth)
+
+    def set_depth(self, depth):
+        if isinstance(depth, dict):
+            self.depth = dict((s, depth.get(s)) for s in self.symbol_list)
+        else:
+            self.depth = dict((s, depth) for s in self.symbol_list)
+
+    def copy(self):
+        """
+        New store over the same arrays with its own cursors, so several
+        backtests can replay one loaded data set.
+        """
+        store = BarStore(self.symbol_list, depth=self.depth)
+        store.timestamps = dict(self.timestamps)
+        store.columns = dict((s, dict(c)) for s, c in self.columns.items())
+        store.length = dict(self.length)
+        return store
+
+    def history_start(self, symbol):
+        """
+        Index of the oldest bar within the depth of symbol.
+        """
+        depth = self.depth[symbol]
+        if depth is None:
+            return 0
+        return max(self.cursor[symbol] - depth, 0)
+
+    def between(self, start, end):
+        """
+        New store over the bars with start <= timestamp < end, sharing
+        memory with this one.
+        """
+        store = BarStore(self.symbol_list, depth=self.depth)
+        for s in self.symbol_list:
+            timestamps = self.get_values(s, 'timestamp')
+            offset = self.length[s] - len(timestamps)
+            first, last = np.searchsorted(timestamps, [start, end], side='left') + offset
+            store.set_bars(s, self.timestamps[s][first:last],
+                           dict((c, v[first:last]) for c, v in self.columns[s].items()))
+        return store
+
+    def timeline(self):
+        """
+        Sorted union of the timestamps of all symbols.
+        """
+        timeline = None
+        for s in self.symbol_list:
+            timestamps = self.get_values(s, 'timestamp')
+            timeline = timestamps if timeline is None else np.union1d(timeline, timestamps)
+        return timeline
+
+    def set_bars(self, symbol, timestamps, columns):
+        self.timestamps[symbol] = np.ascontiguousarray(timestamps, dtype=np.int64)
+        self.columns[symbol] = dict(
+            (k, np.ascontiguousarray(v, dtype=np.float64)) for k, v in columns.items()
+        )
+        self.length[symbol] = len(self.timestamps[symbol])
+        self.cursor[symbol] = 0
+        self.count[symbol] = 0
+
+    def advance(self, symbol):
+        if self.cursor[symbol] < self.length[symbol]:
+            self.cursor[symbol] += 1
+            self.count[symbol] += 1
+            return True
+        return False
+
+    def append(self, symbol, timestamp, values):
+        self.count[symbol] += 1
+        if self.depth[symbol] is not None:
+            self._ring_append(symbol, timestamp, values)
+            return
+
+        n = self.length[symbol]
+        if n == len(self.timestamps[symbol]):
+            self._grow(symbol, max(self.MIN_CAPACITY, 2 * n))
+
+        columns = self.columns[symbol]
+        for k, v in values.items():
+            if k not in columns:
+                columns[k] = np.full(len(self.timestamps[symbol]), np.nan)
+            columns[k][n] = v
+        self.timestamps[symbol][n] = timestamp
+        self.length[symbol] = n + 1
+        self.cursor[symbol] = n + 1
+
+    def _ring_append(self, symbol, timestamp, values):
+        depth = self.depth[symbol]
+        if symbol not in self.ring_count:
+            self._start_ring(symbol)
+
+        count = self.ring_count[symbol]
+        i = count % depth
+        columns = self.columns[symbol]
+        for k, v in values.items():
+            if k not in columns:
+                columns[k] = np.full(2 * depth, np.nan)
+        for k, column in columns.items():
+            column[i] = column[i + depth] = values.get(k, np.nan)
+        timestamps = self.timestamps[symbol]
+        timestamps[i] = timestamps[i + depth] = timestamp
+
+        # The latest bars end at count until the ring is full, then they
+        # end in the second copy
+        count += 1
+        self.ring_count[symbol] = count
+        end = count if count < depth else count % depth + depth
+        self.length[symbol] = end
+        self.cursor[symbol] = end
+
+    def _start_ring(self, symbol):
+        depth = self.depth[symbol]
+        n = self.length[symbol]
+        start = max(n - depth, 0)
+        timestamps = self.timestamps[symbol][start:n]
+        columns = dict((k, v[start:n]) for k, v in self.columns[symbol].items())
+
+        self.timestamps[symbol] = np.empty(2 * depth, dtype=np.int64)
+        self.columns[symbol] = dict((k, np.full(2 * depth, np.nan)) for k in columns)
+        self.ring_count[symbol] = 0
+        for i in range(len(timestamps)):
+            self._ring_append(symbol, timestamps[i], dict((k, v[i]) for k, v in columns.items()))
+
+    def _grow(self, symbol, capacity):
+        n = self.length[symbol]
+
+        timestamps = np.empty(capacity, dtype=np.int64)
+        timestamps[:n] = self.timestamps[symbol][:n]
+        self.timestamps[symbol] = timestamps
+
+        columns = self.columns[symbol]
+        for k in columns:
+            column = np.full(capacity, np.nan)
+            column[:n] = columns[k][:n]
+            columns[k] = column
+
+    def get_value(self, symbol, field, index):
+        if field == 'symbol':
+            return symbol
+        timestamp = self.timestamps[symbol][index]
+        if field == 'timestamp':
+            return timestamp
+        if field == 'datetime':
+            return datetime.datetime.fromtimestamp(timestamp)
+        try:
+            return self.columns[symbol][field][index]
+        except KeyError:
+            raise AttributeError(field)
+
+    def get_bar_dict(self, symbol, index):
+        timestamp = self.timestamps[symbol][index]
+        d = {
+            'symbol': symbol,
+            'datetime': datetime.datetime.fromtimestamp(timestamp),
+            'timestamp': timestamp,
+        }
+        for k, column in self.columns[symbol].items():
+            d[k] = column[index]
+        return d
+
+    def get_values(self, symbol, field):
+        """
+        Values of every bar loaded, or only those still in the ring
+        buffer for appended bars of a symbol with a depth.
+        """
+        n = self.length[symbol]
+        start = max(n - self.depth[symbol], 0) if symbol in self.ring_count else 0
+        if field == 'timestamp':
+            return self.timestamps[symbol][start:n]
+        if field == 'datetime':
+            return [datetime.datetime.fromtimestamp(t) for t in self.timestamps[symbol][start:n]]
+        if field == 'symbol':
+            return [symbol] * (n - start)
+        return self.columns[symbol][field][start:n]
+
+    def get_latest_values(self, symbol, field, N=1):
+        stop = self.cursor[symbol]
+        start = max(stop - N, self.history_start(symbol))
+        if field == 'timestamp':
+            return self.timestamps[symbol][start:stop]
+        if field == 'datetime':
+            return [datetime.datetime.fromtimestamp(t) for t in self.timestamps[symbol][start:stop]]
+        if field == 'symbol':
+            return [symbol] * (stop - start)
+        return self.columns[symbol][field][start:stop]
+
+    def get_latest_bars(self, symbol, N=1):
+        stop = self.cursor[symbol]
+        start = max(stop - N, self.history_start(symbol))
+        return [BarView(self, symbol, i) for i in range(start, stop)]
+
+    def get_latest_bar(self, symbol):
+        index = self.cursor[symbol] - 1
+        if index < 0:
+            return None
+        return BarView(self, symbol, index)
+
+
+CSV_CHUNKSIZE = 100000
+
+
+def read_csv_bars(fname, nrows=None, start=None, end=None):
+    """
+    Parse a bar CSV (timestamp index column, one column per field) into
+    an int64 timestamp array and a dict of float64 field arrays.
+
+    start and end bound the timestamps kept (inclusive). The file is then
+    read in chunks and reading stops at the first chunk past end, which
+    assumes bars are in timestamp order.
+    """
+    if start is None and end is None:
+        frame = pd.read_csv(fname, header=0, index_col=0, nrows=nrows)
+    else:
+        chunks = []
+        rows = 0
+        for chunk in pd.read_csv(fname, header=0, index_col=0, chunksize=CSV_CHUNKSIZE):
+            timestamps = chunk.index.values
+            keep = np.ones(len(chunk), dtype=bool)
+            if start is not None:
+                keep &= timestamps >= start
+            if end is not None:
+                keep &= timestamps <= end
+            chunks.append(chunk[keep])
+            rows += keep.sum()
+            if (nrows is not None and rows >= nrows) or (end is not None and timestamps[-1] > end):
+                break
+        if chunks:
+            frame = pd.concat(chunks)[:nrows]
+        else:
+            frame = pd.read_csv(fname, header=0, index_col=0, nrows=0)
+    return (frame.index.values.astype(np.int64),
+            dict((c, frame[c].values.astype(np.float64)) for c in frame.columns))
+
+
+def _bar_cache_key(fname):
+    stat = os.stat(fname)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def sort_bars(timestamps, columns):
+    """
+    Bars in timestamp order; the arrays are returned as they are when
+    already sorted.
+    """
+    if np.any(timestamps[1:] < timestamps[:-1]):
+        order = np.argsort(timestamps, kind='mergesort')
+        timestamps = timestamps[order]
+        columns = dict((c, values[order]) for c, values in columns.items())
+    return timestamps, columns
+
+
+def _write_bar_cache(cache_name, record):
+    """
+    Write the cache through a temporary file, so readers never see a
+    partial one. Returns False when the directory is not writable.
+    """
+    tmp_name = '%s.%d.tmp' % (cache_name, os.getpid())
+    try:
+        with open(tmp_name, 'wb') as f:
+            np.save(f, record)
+        os.replace(tmp_name, cache_name)
+    except OSError:
+        try:
+            os.remove(tmp_name)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def load_bars(fname, nrows=None, cache=True, start=None, end=None):
+    """
+    Bars of a CSV file as read by read_csv_bars(), sorted by timestamp.
+    With cache=True the parsed bars are kept next to the CSV in
+    fname + '.npy' and later loads memory-map that file instead of
+    parsing the text again. start and end are then found by binary
+    search, so only the pages of the requested range are ever read. The
+    cache is rebuilt whenever the CSV size or mtime changes; when it
+    cannot be written the parsed bars are returned all the same.
+    """
+    if not cache:
+        return sort_bars(*read_csv_bars(fname, nrows=nrows, start=start, end=end))
+
+    cache_name = fname + '.npy'
+    size, mtime = _bar_cache_key(fname)
+    try:
+        bars = np.load(cache_name, mmap_mode='r')
+        if bars['size'][0] != size or bars['mtime'][0] != mtime:
+            bars = None
+    except (IOError, OSError, ValueError):
+        bars = None
+
+    if bars is None:
+        timestamps, columns = sort_bars(*read_csv_bars(fname))
+
+        # One record whose fields are whole columns, so every column is
+        # contiguous in the file and can be mapped without copying
+        n = len(timestamps)
+        dtype = np.dtype([('size', np.int64), ('mtime', np.int64), ('timestamp', np.int64, (n,))] +
+                         [(c, np.float64, (n,)) for c in columns])
+        record = np.zeros(1, dtype=dtype)
+        record['size'] = size
+        record['mtime'] = mtime
+        record['timestamp'][0] = timestamps
+        for c, values in columns.items():
+            record[c][0] = values
+
+        if _write_bar_cache(cache_name, record):
+            bars = np.load(cache_name, mmap_mode='r')
+        else:
+            bars = record
+
+    timestamps = bars['timestamp'][0]
+    first = 0 if start is None else np.searchsorted(timestamps, start, side='left')
+    last = len(timestamps) if end is None else np.searchsorted(timestamps, end, side='right')
+    if nrows is not None:
+        last = min(last, first + nrows)
+
+    fields = [c for c in bars.dtype.names if c not in ('size', 'mtime', 'timestamp')]
+    return (timestamps[first:last],
+            dict((c, bars[c][0][first:last]) for c in fields))
+
+
+def to_timestamp(dt):
+    """
+    Epoch seconds of a naive local datetime, the inverse of the
+    datetime.fromtimestamp() used for bars. Numbers and None pass through.
+    """
+    if isinstance(dt, datetime.datetime):
+        return dt.timestamp()
+    return dt
+
+
+def pad_bars(timestamps, columns, timeline):
+    """
+    Align bars onto timeline, padding each field forward from the last
+    bar at or before every timeline timestamp (NaN before the first).
+    """
+    if np.array_equal(timestamps, timeline):
+        return columns
+
+    pos = np.searchsorted(timestamps, timeline, side='right') - 1
+    missing = pos < 0
+    pos[missing] = 0
+
+    padded = {}
+    for c, values in columns.items():
+        if len(values):
+            values = values[pos]
+            values[missing] = np.nan
+        else:
+            values = np.full(len(timeline), np.nan)
+        padded[c] = values
+    return padded
+
+
 class DataHandler(object):
     __metaclass__ = ABCMeta
 
+    # Live handlers poll an external feed and are paced by the heartbeat
+    live = False
+
+    # MarketEventPool to take market events from, set by Backtest
+    event_pool = None
+
     @abstractmethod
     def get_latest_bars_values(self, symbol, val_type, N=1):
         raise NotImplementedError("Should implement get_latest_bar_values()")
@@ -38,106 +482,340 @@ class DataHandler(object):
     def update_bars(self):
         raise NotImplementedError("Should implement update_bars()")
 
+    def get_latest_timestamp(self):
+        return self.get_latest_bars_values(self.symbol_list[0], 'timestamp')[-1]
+
+    def get_latest_datetime(self):
+        return datetime.datetime.fromtimestamp(self.get_latest_timestamp())
+
+    def _market_event(self, market_data):
+        if self.event_pool is not None:
+            return self.event_pool.get(market_data)
+        return MarketEvent(market_data=market_data)
+
+    def register_indicator(self, symbol, indicator_cls, field='close', **params):
+        """
+        Return the indicator_cls(**params) instance tracking field of
+        symbol, creating it on first use so strategies asking for the
+        same indicator share one. It is caught up on the bars already
+        streamed and then updated once per new bar by update_bars().
+        """
+        key = (indicator_cls, field, tuple(sorted(params.items())))
+        indicators = self.indicators.setdefault(symbol, {})
+        if key not in indicators:
+            indicator = indicator_cls(**params)
+            store = self.bar_store
+            for value in store.get_latest_values(symbol, field, store.cursor[symbol]):
+                indicator.update(value)
+            indicators[key] = (field, indicator)
+        return indicators[key][1]
+
+    def _update_indicators(self, symbol):
+        indicators = self.indicators.get(symbol)
+        if indicators:
+            store = self.bar_store
+            index = store.cursor[symbol] - 1
+            for field, indicator in indicators.values():
+                indicator.update(store.get_value(symbol, field, index))
+
 
 class HistoricCSVDataHandler(DataHandler):
-    def __init__(self, events, csv_dir, symbol_list, fields, limit=None):
+    def __init__(self, events, csv_dir, symbol_list, fields, limit=None, bar_store=None, cache=True,
+                 start_date=None, end_date=None, history_depth=None):
         self.events = events
         self.csv_dir = csv_dir
         self.symbol_list = symbol_list
         self.fields = fields
 
         self.symbol_data = {}
-        self.latest_symbol_data = {}
+        self.bar_store = None
+        self.indicators = {}
         self.continue_backtest = True
 
         self.limit = limit
-
-        self._open_convert_csv_files()
+        self.cache = cache
+        self.start_date = start_date
+        self.end_date = end_date
+        self.history_depth = history_depth
+
+        if bar_store is None:
+            self._open_convert_csv_files()
+            if not any(self.bar_store.length[s] for s in self.symbol_list):
+                raise ValueError("No bars of %s between %s and %s" % (
+                    ', '.join(self.symbol_list), start_date or 'the start', end_date or 'the end'))
+        else:
+            # Replay bars that were already loaded, e.g. by a parameter sweep
+            self.bar_store = bar_store.copy()
+            if history_depth is not None:
+                self.bar_store.set_depth(history_depth)
+            self.symbol_data = self.bar_store.columns
+            self._open_bar_streams()
 
     def _open_convert_csv_files(self):
         comb_index = None
+        bars = {}
         for s in self.symbol_list:
             fname = os.path.join(self.csv_dir, '%s.csv' % s)
 
-            self.symbol_data[s] = pd.read_csv(
-                fname,
-                header=0,
-                index_col=0,
-                # names=self.fields,
-                nrows=self.limit
-            )
+            bars[s] = self._load_bars(fname)
 
             # Combine the index to pad forward values
             if comb_index is None:
-                comb_index = self.symbol_data[s].index
+                comb_index = bars[s][0]
             else:
-                comb_index.union(self.symbol_data[s].index)
-
-            # Set the latest symbol_data to None
-            self.latest_symbol_data[s] = []
+                comb_index = np.union1d(comb_index, bars[s][0])
+
+        # Symbols move in lockstep, so the timeline starts at the first
+        # timestamp every symbol has a bar for: before it some symbol
+        # would have no price to trade at
+        if all(len(bars[s][0]) for s in self.symbol_list):
+            start = max(bars[s][0][0] for s in self.symbol_list)
+            comb_index = comb_index[np.searchsorted(comb_index, start):]
+        else:
+            comb_index = comb_index[:0]
 
-        # Reindex the dataframes
+        # Pad every symbol onto the combined index
+        self.bar_store = BarStore(self.symbol_list, depth=self.history_depth)
         for s in self.symbol_list:
-            self.symbol_data[s] = self.symbol_data[s].reindex(index=comb_index, method='pad').iterrows()
+            timestamps, columns = bars[s]
+            self.bar_store.set_bars(s, comb_index, pad_bars(timestamps, columns, comb_index))
+        self.symbol_data = self.bar_store.columns
+        self._open_bar_streams()
+
+    def _load_bars(self, fname):
+        return load_bars(fname, nrows=self.limit, cache=self.cache,
+                         start=to_timestamp(self.start_date), end=to_timestamp(self.end_date))
+
+    def _open_bar_streams(self):
+        # One long-lived stream per symbol, advanced by update_bars()
+        self._bar_streams = dict((s, self._get_new_bar(s)) for s in self.symbol_list)
 
     def _get_new_bar(self, symbol):
-        for b in self.symbol_data[symbol]:
-            yield DataPoint({
-                'symbol': symbol,
-                'datetime': datetime.datetime.fromtimestamp(b[0]),
-                'timestamp': b[0],
-                'open': b[1].open,
-                'high': b[1].high,
-                'low': b[1].low,
-                'close': b[1].close,
-                'volume': b[1].volume
-            })
+        store = self.bar_store
+        while store.advance(symbol):
+            yield store.get_latest_bar(symbol)
 
     def get_latest_bars_values(self, symbol, val_type, N=1):
-        return [getattr(b, val_type) for b in self.get_latest_bars(symbol, N)]
+        try:
+            return self.bar_store.get_latest_values(symbol, val_type, N)
+        except KeyError:
+            print("That symbol is not available in the historical data set.")
 
     def get_latest_bars(self, symbol, N=1):
         try:
-            bars_list = self.latest_symbol_data[symbol]
+            return self.bar_store.get_latest_bars(symbol, N)
+        except KeyError:
+            print("That symbol is not available in the historical data set.")
+
+    def get_all_bars_values(self, symbol, val_type):
+        """
+        Values of val_type over the whole loaded history, regardless of
+        how far the backtest has advanced. Used by vectorized strategies.
+        """
+        try:
+            return self.bar_store.get_values(symbol, val_type)
         except KeyError:
             print("That symbol is not available in the historical data set.")
-        else:
-            return bars_list[-N:]
 
     def update_bars(self):
+        market_data = {}
         for s in self.symbol_list:
             try:
-                bar = next(self._get_new_bar(s))
+                market_data[s] = next(self._bar_streams[s])
+                self._update_indicators(s)
             except StopIteration:
                 self.continue_backtest = False
+                market_data[s] = self.bar_store.get_latest_bar(s)
+        self.events.put(self._market_event(market_data))
+
+
+class MergedCSVDataHandler(HistoricCSVDataHandler):
+    """
+    Streams the bars of all symbols in timestamp order with a k-way
+    merge of the per-symbol cursors, emitting one MarketEvent per
+    distinct timestamp that carries only the symbols with a bar at that
+    time. Symbols keep their own timelines: nothing is padded up front,
+    the latest bar of a symbol simply stays current until its next one.
+    """
+    def _open_convert_csv_files(self):
+        self.bar_store = BarStore(self.symbol_list, depth=self.history_depth)
+        for s in self.symbol_list:
+            fname = os.path.join(self.csv_dir, '%s.csv' % s)
+            timestamps, columns = self._load_bars(fname)
+            self.bar_store.set_bars(s, timestamps, columns)
+        self.symbol_data = self.bar_store.columns
+        self._open_bar_streams()
+
+    def _open_bar_streams(self):
+        # Heap of (next timestamp, symbol position) for every symbol with bars left
+        store = self.bar_store
+        self._heap = [
+            (int(store.timestamps[s][store.cursor[s]]), i)
+            for i, s in enumerate(self.symbol_list)
+            if store.cursor[s] < store.length[s]
+        ]
+        heapq.heapify(self._heap)
+        self.current_timestamp = None
+        self.continue_backtest = bool(self._heap)
+
+    def get_latest_timestamp(self):
+        return self.current_timestamp
+
+    def update_bars(self):
+        heap = self._heap
+        if not heap:
+            self.continue_backtest = False
+            return
+
+        store = self.bar_store
+        timestamp = heap[0][0]
+        market_data = {}
+        while heap and heap[0][0] == timestamp:
+            i = heap[0][1]
+            s = self.symbol_list[i]
+            store.advance(s)
+            market_data[s] = store.get_latest_bar(s)
+            self._update_indicators(s)
+
+            cursor = store.cursor[s]
+            if cursor < store.length[s]:
+                heapq.heapreplace(heap, (int(store.timestamps[s][cursor]), i))
             else:
-                if bar is not None:
-                    self.latest_symbol_data[s].append(bar)
-        self.events.put(MarketEvent(market_data={s: self.latest_symbol_data[s][-1] for s in self.symbol_list}))
+                heapq.heappop(heap)
+
+        self.current_timestamp = timestamp
+        self.continue_backtest = bool(heap)
+        self.events.put(self._market_event(market_data))
+
+
+POLONIEX_PUBLIC_API = 'https://poloniex.com/public'
+POLONIEX_FIELDS = ('open', 'high', 'low', 'close', 'volume')
 
 
 class PoloniexDataHandler(HistoricCSVDataHandler):
-    def __init__(self, events, symbol_list, period):
+    """
+    Live bars of period seconds from the Poloniex public API.
+
+    Every update_bars() polls all symbols concurrently: the requests run
+    on a thread pool over one pooled requests.Session, gathered by an
+    asyncio event loop, and ask only for the bars after the last one
+    seen (lookback bars on the first poll). Closed bars are appended to
+    the bar store and pushed as one MarketEvent per new timestamp,
+    carrying the symbols that have a bar then, as MergedCSVDataHandler
+    does. The bar still forming is left for a later poll.
+
+    Applications running their own asyncio loop can await poll(), or
+    stream() to keep polling, and consume the events from a
+    QueueEventBus.
+    """
+    live = True
+
+    def __init__(self, events, symbol_list, period, history_depth=None, base_url=POLONIEX_PUBLIC_API,
+                 lookback=1, timeout=10.0, clock=time.time):
+        if not symbol_list:
+            raise ValueError("PoloniexDataHandler needs at least one symbol")
         self.events = events
         self.symbol_list = symbol_list
+        self.history_depth = history_depth
 
-        self.latest_symbol_data = {s: [] for s in self.symbol_list}
+        self.bar_store = BarStore(self.symbol_list, depth=self.history_depth)
+        self.indicators = {}
         self.continue_backtest = True
 
         self.period = period
+        self.base_url = base_url
+        self.lookback = lookback
+        self.timeout = timeout
+        self.clock = clock
+
+        self.last_timestamp = dict((s, None) for s in self.symbol_list)
+        self.current_timestamp = None
+
+        # One keep-alive connection per symbol, reused across polls
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=len(symbol_list))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=len(symbol_list))
+        self._loop = None
+
+    def get_latest_timestamp(self):
+        return self.current_timestamp
+
+    def fetch_chart_data(self, symbol, start, end):
+        response = self.session.get(self.base_url, params={
+            'command': 'returnChartData',
+            'currencyPair': symbol,
+            'start': int(start),
+            'end': int(end),
+            'period': self.period,
+        }, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        if isinstance(data, dict):
+            raise ValueError(data.get('error', data))
+        return data
+
+    async def poll(self):
+        """
+        Fetch the new bars of every symbol and put their MarketEvents.
+        Returns the number of events put.
+        """
+        loop = asyncio.get_running_loop()
+        now = self.clock()
+        starts = [
+            now - (self.lookback + 1) * self.period if last is None else last + 1
+            for last in (self.last_timestamp[s] for s in self.symbol_list)
+        ]
+        results = await asyncio.gather(*[
+            loop.run_in_executor(self.executor, self.fetch_chart_data, s, start, now)
+            for s, start in zip(self.symbol_list, starts)
+        ], return_exceptions=True)
+
+        bars = []
+        for i, (s, result) in enumerate(zip(self.symbol_list, results)):
+            if isinstance(result, Exception):
+                print("Could not fetch bars of {}: {}".format(s, result))
+                continue
+            last = self.last_timestamp[s]
+            for bar in result:
+                timestamp = int(bar['date'])
+                # An empty result is a single bar dated 0
+                if timestamp == 0 or (last is not None and timestamp <= last):
+                    continue
+                if timestamp + self.period > now:
+                    continue
+                bars.append((timestamp, i, bar))
+        bars.sort(key=lambda b: (b[0], b[1]))
+
+        events = 0
+        market_data = {}
+        for j, (timestamp, i, bar) in enumerate(bars):
+            s = self.symbol_list[i]
+            self.bar_store.append(s, timestamp, dict((f, float(bar[f])) for f in POLONIEX_FIELDS))
+            self._update_indicators(s)
+            self.last_timestamp[s] = timestamp
+            market_data[s] = self.bar_store.get_latest_bar(s)
+
+            if j + 1 == len(bars) or bars[j + 1][0] != timestamp:
+                self.current_timestamp = timestamp
+                self.events.put(self._market_event(market_data))
+                market_data = {}
+                events += 1
+        return events
+
+    async def stream(self, interval):
+        while self.continue_backtest:
+            await self.poll()
+            await asyncio.sleep(interval)
 
-    def _get_new_bar(self, symbol):
-        polo = Poloniex()
-        start = datetime.datetime.now() - datetime.timedelta(days=1)
-        data = polo.returnChartData(symbol, period=self.period, start=start.timestamp())[-1]
-
-        yield DataPoint({
-            'symbol': symbol,
-            'datetime': datetime.datetime.fromtimestamp(data['date']),
-            'timestamp': data['date'],
-            'open': data['open'],
-            'high': data['high'],
-            'low': data['low'],
-            'close': data['close'],
-            'volume': data['volume']
-        })
+    def update_bars(self):
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self.poll())
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+        if self._loop is not None:
+            self._loop.close()
@@ -1,22 +1,76 @@
+from abc import ABCMeta, abstractmethod
+from collections import deque
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+
 class Broker:
     INTERACTIVE_BROKER = 'IB'
 
 
-class Event:
-    pass
+class EventType(object):
+    """
+    Integer tags of the event types, as type_id on every event. type keeps
+    the name for code that compares strings.
+    """
+    MARKET = 0
+    SIGNAL = 1
+    ORDER = 2
+    FILL = 3
+
+    names = ('MARKET', 'SIGNAL', 'ORDER', 'FILL')
+
+
+class Event(object):
+    # Events are created in the inner loop: slots keep them small and
+    # quick to build, without a per-instance __dict__
+    __slots__ = ()
 
 
 class MarketEvent(Event):
+    __slots__ = ('market_data',)
     type = 'MARKET'
+    type_id = EventType.MARKET
 
     def __init__(self, market_data):
         self.market_data = market_data
 
 
+class MarketEventPool(object):
+    """
+    Recycles MarketEvent instances. The backtest loop releases each
+    MarketEvent once it has been processed, so only use it when no
+    component keeps market events beyond their tick.
+    """
+    def __init__(self):
+        self._free = []
+
+    def get(self, market_data):
+        if self._free:
+            event = self._free.pop()
+            event.market_data = market_data
+            return event
+        return MarketEvent(market_data)
+
+    def release(self, event):
+        """
+        Hand event back for the next get(). Its market_data is cleared and
+        then replaced with the next bar's, so handlers must not keep a
+        MarketEvent past their call; copy what they need from it instead.
+        """
+        event.market_data = None
+        self._free.append(event)
+
+
 class SignalEvent(Event):
-    def __init__(self, strategy_id, symbol, datetime, signal_type, strength):
-        self.type = 'SIGNAL'
+    __slots__ = ('strategy_id', 'symbol', 'datetime', 'signal_type', 'strength')
+    type = 'SIGNAL'
+    type_id = EventType.SIGNAL
 
+    def __init__(self, strategy_id, symbol, datetime, signal_type, strength):
         self.strategy_id = strategy_id
         self.symbol = symbol
         self.datetime = datetime
@@ -25,14 +79,19 @@ class SignalEvent(Event):
 
 
 class OrderEvent(Event):
+    __slots__ = ('symbol', 'order_type', 'quantity', 'direction', 'price', 'datetime')
+    type = 'ORDER'
+    type_id = EventType.ORDER
+
     def __init__(self, symbol, order_type, quantity, direction, price=None):
-        self.type = 'ORDER'
         self.symbol = symbol
         self.order_type = order_type
         self.quantity = quantity
         self.direction = direction
 
         self.price = price
+        # Set by the execution handler when it accepts the order
+        self.datetime = None
 
     def print_order(self):
         print("Order: Symbol={}, Type={}, Quantity={}, Direction={}".format(self.symbol, self.order_type, self.quantity,
@@ -40,9 +99,12 @@ class OrderEvent(Event):
 
 
 class FillEvent(Event):
+    __slots__ = ('timeindex', 'symbol', 'exchange', 'quantity', 'direction', 'price', 'maker', 'commission')
+    type = 'FILL'
+    type_id = EventType.FILL
+
     def __init__(self, timeindex, symbol, exchange, quantity,
-                 direction, price, commission=None):
-        self.type = 'FILL'
+                 direction, price, commission=None, maker=False):
         self.timeindex = timeindex
         self.symbol = symbol
         self.exchange = exchange
@@ -50,6 +112,9 @@ class FillEvent(Event):
         self.direction = direction
         self.price = price
 
+        # Whether the order added liquidity, for maker/taker fee schedules
+        self.maker = maker
+
         # Calculate commission
         if commission is None:
             self.commission = self.calculate_commission(Broker.INTERACTIVE_BROKER)
@@ -59,3 +124,67 @@ class FillEvent(Event):
     def calculate_commission(self, broker):
         commission = 0.002
         return commission
+
+
+class EventBus(object):
+    """
+    Channel between the data handler, strategy, portfolio and execution
+    handler. Components only put() events; the backtest loop drains the
+    bus with poll(), which returns None once it is empty.
+    """
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def put(self, event):
+        raise NotImplementedError("Should implement put()")
+
+    @abstractmethod
+    def get(self, block=True, timeout=None):
+        raise NotImplementedError("Should implement get()")
+
+    @abstractmethod
+    def poll(self):
+        raise NotImplementedError("Should implement poll()")
+
+
+class DequeEventBus(EventBus):
+    """
+    Lock-free bus for single-threaded backtests, backed by a deque.
+    """
+    def __init__(self):
+        self._events = deque()
+
+    def put(self, event, block=True, timeout=None):
+        self._events.append(event)
+
+    def get(self, block=True, timeout=None):
+        try:
+            return self._events.popleft()
+        except IndexError:
+            raise queue.Empty
+
+    def poll(self):
+        if self._events:
+            return self._events.popleft()
+        return None
+
+    def empty(self):
+        return not self._events
+
+    def qsize(self):
+        return len(self._events)
+
+    def __len__(self):
+        return len(self._events)
+
+
+class QueueEventBus(queue.Queue, EventBus):
+    """
+    Thread-safe bus for live trading, where feeds may put events from
+    other threads.
+    """
+    def poll(self):
+        try:
+            return self.get(False)
+        except queue.Empty:
+            return None
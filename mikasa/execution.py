@@ -1,8 +1,12 @@
 import datetime
+import heapq
 
 from abc import ABCMeta, abstractmethod
 
-from .event import FillEvent, OrderEvent
+import numpy as np
+
+from .event import EventType, FillEvent, OrderEvent
+from .fill import OrderBook
 
 
 class ExecutionHandler(object):
@@ -14,34 +18,122 @@ class ExecutionHandler(object):
 
 
 class SimulatedExecutionHandler(ExecutionHandler):
-    def __init__(self, events, portfolio):
+    """
+    Fills market orders straight away at the latest close and stops when
+    a close crosses their price. Every fill is put on the events queue.
+
+    With a fill_model (see mikasa.fill) every order instead waits in an
+    OrderBook and the model fills the whole book against each following
+    bar, e.g. at the next open or on the bar's high/low, with slippage
+    and volume-capped partial fills.
+    """
+    BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, events, portfolio, fill_model=None):
         self.events = events
-        self.stop_orders = []
+        self.fill_model = fill_model
+        self.order_book = None
+        if fill_model is not None:
+            self.order_book = OrderBook(portfolio.bars.symbol_list)
+
+        # symbol -> direction -> heap of (key, sequence, order). The key is
+        # the price of BUY stops and minus the price of SELL stops, so the
+        # root is always the next order to trigger.
+        self.stop_book = {}
+        self._stop_sequence = 0
 
         self.portfolio = portfolio
 
+    @property
+    def stop_orders(self):
+        """
+        Resting stop orders, in the order they were placed.
+        """
+        entries = [e for book in self.stop_book.values() for heap in book.values() for e in heap]
+        return [order for _, _, order in sorted(entries, key=lambda e: e[1])]
+
+    def add_stop_order(self, order):
+        book = self.stop_book.setdefault(order.symbol, {'BUY': [], 'SELL': []})
+        key = order.price if order.direction == 'BUY' else -order.price
+        heapq.heappush(book[order.direction], (key, self._stop_sequence, order))
+        self._stop_sequence += 1
+
+    def _stop_order_fill(self, order):
+        return FillEvent(order.datetime, order.symbol,
+                         'BACKTEST', order.quantity, order.direction, order.price)
+
+    def _bar_values(self, event):
+        """
+        Values of BAR_FIELDS for every symbol, NaN for the symbols without
+        a bar in event and for fields that were not loaded.
+        """
+        store = self.portfolio.bars.bar_store
+        values = dict((f, np.full(len(self.order_book.symbol_list), np.nan)) for f in self.BAR_FIELDS)
+        for i, s in enumerate(self.order_book.symbol_list):
+            if s not in event.market_data:
+                continue
+            index = store.cursor[s] - 1
+            columns = store.columns[s]
+            for f in self.BAR_FIELDS:
+                if f in columns:
+                    values[f][i] = columns[f][index]
+        return values
+
+    def fill_order_book(self, event):
+        book = self.order_book
+        book.merge()
+        if not len(book):
+            return
+
+        values = self._bar_values(event)
+        bars = dict((f, v[book.symbol]) for f, v in values.items())
+        quantities, prices = self.fill_model.fill(book, bars)
+        has_bar = np.array([s in event.market_data for s in book.symbol_list])[book.symbol]
+        quantities = np.where(has_bar, quantities, 0.0)
+
+        for i in np.flatnonzero(quantities > 0):
+            order = book.orders[i]
+            self.events.put(FillEvent(event.market_data[order.symbol].datetime, order.symbol,
+                                      'BACKTEST', quantities[i], order.direction, prices[i]))
+
+        # Partly filled orders stay in the book as market orders for the rest
+        remaining = book.quantity - quantities
+        partial = (quantities > 0) & (remaining > 0)
+        book.quantity = remaining
+        book.price[partial] = np.nan
+        book.keep(remaining > 0)
+
     def check_stop_orders(self, event):
-        if event.type == 'MARKET':
-            for order in self.stop_orders:
-                for s in event.market_data:
-                    if order.symbol == s:
-                        if event.market_data[s].close > order.price and order.direction == 'BUY':
-                            fill_event = FillEvent(order.datetime, order.symbol,
-                                       'BACKTEST', order.quantity, order.direction, order.price)
-                            self.portfolio.update_fill(fill_event)
-                            self.stop_orders.remove(order)
-                        if event.market_data[s].close < order.price and order.direction == 'SELL':
-                            fill_event = FillEvent(order.datetime, order.symbol,
-                                       'BACKTEST', order.quantity, order.direction, order.price)
-                            self.portfolio.update_fill(fill_event)
-                            self.stop_orders.remove(order)
+        if event.type_id == EventType.MARKET:
+            if self.fill_model is not None:
+                self.fill_order_book(event)
+                return
+
+            for s, bar in event.market_data.items():
+                book = self.stop_book.get(s)
+                if book is None:
+                    continue
+
+                # Only the orders whose price was crossed leave the heaps:
+                # BUY stops trigger above their price, SELL stops below
+                close = bar.close
+                buys = book['BUY']
+                while buys and close > buys[0][0]:
+                    self.events.put(self._stop_order_fill(heapq.heappop(buys)[2]))
+                sells = book['SELL']
+                while sells and close < -sells[0][0]:
+                    self.events.put(self._stop_order_fill(heapq.heappop(sells)[2]))
 
     def execute_order(self, event):
-        if event.type == 'ORDER':
+        if event.type_id == EventType.ORDER:
+            if self.fill_model is not None:
+                self.order_book.add(event)
+                return
+
             if event.order_type == 'MKT':
                 fill_event = FillEvent(datetime.datetime.utcnow(), event.symbol,
                                        'BACKTEST', event.quantity, event.direction, None)
                 self.events.put(fill_event)
             if event.order_type == 'STP':
                 event.datetime = datetime.datetime.utcnow()
-                self.stop_orders.append(event)
+                self.add_stop_order(event)
@@ -0,0 +1,133 @@
+from abc import ABCMeta, abstractmethod
+from collections import deque
+
+import numpy as np
+
+DAY = 24 * 60 * 60
+
+
+class FeeSchedule(object):
+    """
+    Commission rates for a batch of fills traded at one timestamp.
+
+    rates() takes arrays of the fills' notional value (price times
+    quantity, in the quote currency), whether each one added liquidity
+    (maker) and the exchange it traded on, and returns the commission
+    rate of every fill. Schedules that depend on past volume update
+    their state from the batch as they go.
+    """
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def rates(self, timestamp, notional, maker, exchange):
+        raise NotImplementedError("Should implement rates()")
+
+
+class FlatFee(FeeSchedule):
+    """
+    The same rate for every fill, 0.002 by default as FillEvent. Like
+    every schedule it is charged on the absolute notional, whereas
+    without a schedule NaivePortfolio and VectorizedPortfolio charge
+    FillEvent's rate on the signed cost, so sells there earn a rebate.
+    """
+    def __init__(self, rate=0.002):
+        self.rate = rate
+
+    def rates(self, timestamp, notional, maker, exchange):
+        return np.full(len(notional), self.rate)
+
+
+class MakerTakerFee(FeeSchedule):
+    def __init__(self, maker, taker):
+        self.maker = maker
+        self.taker = taker
+
+    def rates(self, timestamp, notional, maker, exchange):
+        return np.where(maker, self.maker, self.taker)
+
+
+class TieredFee(FeeSchedule):
+    """
+    Maker/taker rates by trailing traded volume, as most exchanges charge.
+
+    tiers is a list of (minimum volume, maker rate, taker rate) sorted by
+    volume, the first starting at 0. A batch is charged at the tier of
+    the volume traded over the window (30 days by default) before it.
+    The trailing volume is a running sum over a deque of batch volumes,
+    so old batches are dropped as they expire instead of rescanning
+    the fill history.
+    """
+    def __init__(self, tiers, window=30 * DAY):
+        self.tiers = tiers
+        self.window = window
+
+        self.thresholds = np.array([t[0] for t in tiers], dtype=np.float64)
+        self.maker_rates = np.array([t[1] for t in tiers], dtype=np.float64)
+        self.taker_rates = np.array([t[2] for t in tiers], dtype=np.float64)
+
+        self.history = deque()
+        self.volume = 0.0
+
+    def trailing_volume(self, timestamp):
+        history = self.history
+        while history and history[0][0] <= timestamp - self.window:
+            self.volume -= history.popleft()[1]
+        if not history:
+            # Reset the running sum so rounding errors cannot accumulate
+            self.volume = 0.0
+        return self.volume
+
+    def tier(self, timestamp):
+        return np.searchsorted(self.thresholds, self.trailing_volume(timestamp), side='right') - 1
+
+    def record(self, timestamp, volume):
+        if volume:
+            self.history.append((timestamp, volume))
+            self.volume += volume
+
+    def rates(self, timestamp, notional, maker, exchange):
+        tier = self.tier(timestamp)
+        rates = np.where(maker, self.maker_rates[tier], self.taker_rates[tier])
+        self.record(timestamp, float(np.sum(notional)))
+        return rates
+
+
+class ExchangeFeeSchedule(FeeSchedule):
+    """
+    One schedule per exchange name, and default for the others.
+    """
+    def __init__(self, schedules, default=None):
+        self.schedules = schedules
+        self.default = default if default is not None else FlatFee()
+
+    def rates(self, timestamp, notional, maker, exchange):
+        notional = np.asarray(notional, dtype=np.float64)
+        maker = np.asarray(maker, dtype=bool)
+        exchange = np.asarray(exchange, dtype=object)
+
+        rates = np.empty(len(notional))
+        remaining = np.ones(len(notional), dtype=bool)
+        for name, schedule in self.schedules.items():
+            mask = exchange == name
+            if mask.any():
+                rates[mask] = schedule.rates(timestamp, notional[mask], maker[mask], exchange[mask])
+                remaining &= ~mask
+        if remaining.any():
+            rates[remaining] = self.default.rates(timestamp, notional[remaining], maker[remaining],
+                                                  exchange[remaining])
+        return rates
+
+
+# 30-day BTC volume tiers of Poloniex as of 2017: (volume, maker, taker)
+POLONIEX_TIERS = [
+    (0.0, 0.0015, 0.0025),
+    (600.0, 0.0014, 0.0024),
+    (1200.0, 0.0012, 0.0022),
+    (2400.0, 0.0010, 0.0020),
+    (6000.0, 0.0008, 0.0016),
+    (12000.0, 0.0005, 0.0014),
+    (18000.0, 0.0002, 0.0012),
+    (24000.0, 0.0000, 0.0010),
+    (60000.0, 0.0000, 0.0008),
+    (120000.0, 0.0000, 0.0005),
+]
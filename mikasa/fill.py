@@ -0,0 +1,195 @@
+import numpy as np
+
+from abc import ABCMeta, abstractmethod
+
+
+class OrderBook(object):
+    """
+    Columnar book of the orders waiting to be filled: one array per
+    attribute, so a fill model can evaluate every order of a tick at
+    once. direction is +1 for BUY and -1 for SELL; price is the stop
+    price, NaN for market orders.
+    """
+    DIRECTIONS = {'BUY': 1.0, 'SELL': -1.0}
+
+    def __init__(self, symbol_list):
+        self.symbol_list = symbol_list
+        self.symbol_index = dict((s, i) for i, s in enumerate(symbol_list))
+
+        self.symbol = np.empty(0, dtype=np.int64)
+        self.direction = np.empty(0)
+        self.quantity = np.empty(0)
+        self.price = np.empty(0)
+        self.orders = np.empty(0, dtype=object)
+
+        # Orders placed since the last merge, kept as rows until then
+        self._new = []
+
+    def __len__(self):
+        return len(self.orders) + len(self._new)
+
+    def add(self, order):
+        price = order.price if order.order_type == 'STP' else np.nan
+        self._new.append((self.symbol_index[order.symbol], self.DIRECTIONS[order.direction],
+                          order.quantity, price, order))
+
+    def merge(self):
+        if not self._new:
+            return
+        symbol, direction, quantity, price, orders = zip(*self._new)
+        self.symbol = np.concatenate([self.symbol, np.array(symbol, dtype=np.int64)])
+        self.direction = np.concatenate([self.direction, direction])
+        self.quantity = np.concatenate([self.quantity, quantity])
+        self.price = np.concatenate([self.price, price])
+        new_orders = np.empty(len(orders), dtype=object)
+        new_orders[:] = orders
+        self.orders = np.concatenate([self.orders, new_orders])
+        self._new = []
+
+    def keep(self, mask):
+        self.symbol = self.symbol[mask]
+        self.direction = self.direction[mask]
+        self.quantity = self.quantity[mask]
+        self.price = self.price[mask]
+        self.orders = self.orders[mask]
+
+
+class Slippage(object):
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def apply(self, prices, direction):
+        raise NotImplementedError("Should implement apply()")
+
+
+class FixedSlippage(Slippage):
+    """
+    Buys pay amount more per unit than the model price, sells get amount less.
+    """
+    def __init__(self, amount):
+        self.amount = amount
+
+    def apply(self, prices, direction):
+        return prices + direction * self.amount
+
+
+class ProportionalSlippage(Slippage):
+    """
+    Buys pay rate (e.g. 0.0005 for 5 bps) above the model price, sells get rate below.
+    """
+    def __init__(self, rate):
+        self.rate = rate
+
+    def apply(self, prices, direction):
+        return prices * (1.0 + direction * self.rate)
+
+
+def _cap_by_group(groups, quantities, caps):
+    """
+    Fill quantities in order, with the total of each group capped: an
+    order gets what is left of its group's cap after the orders before it.
+    """
+    order = np.argsort(groups, kind='mergesort')
+    q = quantities[order]
+    g = groups[order]
+
+    total = np.cumsum(q)
+    first = np.r_[True, g[1:] != g[:-1]]
+    group_offset = np.maximum.accumulate(np.where(first, total - q, 0.0))
+    before = total - q - group_offset
+
+    filled = np.empty_like(q)
+    filled[order] = np.clip(caps[order] - before, 0.0, q)
+    return filled
+
+
+class FillModel(object):
+    """
+    Decides which pending orders fill on a bar, how much and at what
+    price, for the whole OrderBook at once.
+
+    Subclasses implement trigger(), which returns the mask of orders that
+    trade on the bar and their price before slippage. With volume_limit
+    the quantity traded per symbol is capped at that fraction of the bar
+    volume, earlier orders first; the rest stays in the book as a market
+    order. Bars without a volume, e.g. from CSVs with no volume column,
+    put no cap on their orders.
+
+    bars maps open, high, low, close and volume to the values of the bar
+    of each order's symbol; fields that were not loaded are NaN.
+    """
+    __metaclass__ = ABCMeta
+
+    def __init__(self, slippage=None, volume_limit=None):
+        self.slippage = slippage
+        self.volume_limit = volume_limit
+
+    @abstractmethod
+    def trigger(self, book, bars):
+        raise NotImplementedError("Should implement trigger()")
+
+    def fill(self, book, bars):
+        """
+        Return the quantity filled (0 when not filled) and price of every
+        order in the book.
+        """
+        triggered, prices = self.trigger(book, bars)
+        quantities = np.where(triggered, book.quantity, 0.0)
+
+        if self.volume_limit is not None:
+            volume = bars['volume']
+            caps = np.where(np.isnan(volume), np.inf, self.volume_limit * volume)
+            quantities = _cap_by_group(book.symbol, quantities, caps)
+
+        if self.slippage is not None:
+            prices = self.slippage.apply(prices, book.direction)
+        return quantities, prices
+
+
+class CloseFillModel(FillModel):
+    """
+    Market orders fill at the close; stops trigger when the close crosses
+    their price and fill at that price. Orders wait in the book for the
+    next bar, so a market order placed on bar T fills at the close of
+    bar T + 1, one bar later than SimulatedExecutionHandler fills it
+    without a fill model.
+    """
+    def trigger(self, book, bars):
+        close = bars['close']
+        stop = book.price
+        market = np.isnan(stop)
+        triggered = market | (book.direction * (close - stop) > 0)
+        return triggered, np.where(market, close, stop)
+
+
+class NextBarOpenFillModel(FillModel):
+    """
+    Everything trades at the open of the first bar after the order:
+    market orders always, stops when the open is past their price.
+    """
+    def trigger(self, book, bars):
+        open_ = bars['open']
+        stop = book.price
+        triggered = np.isnan(stop) | (book.direction * (open_ - stop) > 0)
+        return triggered, open_
+
+
+class IntrabarFillModel(FillModel):
+    """
+    Market orders fill at the open. Stops trigger when the bar's range
+    reaches their price, the high for BUY stops and the low for SELL
+    stops, and fill at the stop price, or at the open when the bar gaps
+    through it.
+    """
+    def trigger(self, book, bars):
+        open_ = bars['open']
+        stop = book.price
+        market = np.isnan(stop)
+        buy = book.direction > 0
+
+        extreme = np.where(buy, bars['high'], bars['low'])
+        triggered = market | (book.direction * (extreme - stop) >= 0)
+
+        # The worse of the stop and the open, from the trader's side
+        prices = np.where(buy, np.fmax(stop, open_), np.fmin(stop, open_))
+        return triggered, np.where(market, open_, prices)
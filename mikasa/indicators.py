@@ -0,0 +1,270 @@
+from abc import ABCMeta, abstractmethod
+from collections import deque
+
+import numpy as np
+
+
+class Indicator(object):
+    """
+    Stateful indicator of a single series, fed one value per bar by
+    update() in O(1) (amortised for RollingMin/RollingMax). value is the
+    indicator after the latest update, valid once ready is True.
+
+    Strategies usually get them from DataHandler.register_indicator(),
+    which shares one instance per symbol, field and parameters and
+    updates it once per new bar.
+    """
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def update(self, value):
+        raise NotImplementedError("Should implement update()")
+
+
+class SMA(Indicator):
+    """
+    Simple moving average of the last period values.
+
+    Sums are taken around the first value seen to limit rounding drift.
+    """
+    def __init__(self, period):
+        self.period = period
+
+        self.values = deque()
+        self.shift = None
+        self.sum = 0.0
+
+    def update(self, value):
+        if self.shift is None:
+            self.shift = value
+        self.values.append(value)
+        self.sum += value - self.shift
+
+        if len(self.values) > self.period:
+            self.sum -= self.values.popleft() - self.shift
+
+    @property
+    def ready(self):
+        return len(self.values) == self.period
+
+    @property
+    def value(self):
+        return self.shift + self.sum / len(self.values)
+
+
+class EMA(Indicator):
+    """
+    Exponential moving average with alpha = 2 / (period + 1), seeded with
+    the first value (pandas' ewm(span=period, adjust=False)). Reported
+    ready after period values.
+    """
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+
+        self.count = 0
+        self.value = None
+
+    def update(self, value):
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        self.count += 1
+
+    @property
+    def ready(self):
+        return self.count >= self.period
+
+
+class RollingOLS(object):
+    """
+    Least squares fit of y on x over the last window pairs, kept up to
+    date in O(1) per pair from running sums of x, y, xy and xx.
+
+    Without an intercept (the default, as sm.OLS without add_constant)
+    beta = sum(xy) / sum(xx); with fit_intercept=True the usual slope
+    and intercept are returned in beta and alpha.
+    """
+    def __init__(self, window, fit_intercept=False):
+        self.window = window
+        self.fit_intercept = fit_intercept
+
+        self.pairs = deque()
+        self.sum_x = 0.0
+        self.sum_y = 0.0
+        self.sum_xy = 0.0
+        self.sum_xx = 0.0
+        self.sum_yy = 0.0
+
+    def update(self, x, y):
+        self.pairs.append((x, y))
+        self.sum_x += x
+        self.sum_y += y
+        self.sum_xy += x * y
+        self.sum_xx += x * x
+        self.sum_yy += y * y
+
+        if len(self.pairs) > self.window:
+            x, y = self.pairs.popleft()
+            self.sum_x -= x
+            self.sum_y -= y
+            self.sum_xy -= x * y
+            self.sum_xx -= x * x
+            self.sum_yy -= y * y
+
+    @property
+    def ready(self):
+        return len(self.pairs) == self.window
+
+    @property
+    def beta(self):
+        if not self.fit_intercept:
+            return self.sum_xy / self.sum_xx
+        n = len(self.pairs)
+        return (n * self.sum_xy - self.sum_x * self.sum_y) / (n * self.sum_xx - self.sum_x * self.sum_x)
+
+    @property
+    def alpha(self):
+        if not self.fit_intercept:
+            return 0.0
+        n = len(self.pairs)
+        return (self.sum_y - self.beta * self.sum_x) / n
+
+
+def _window_sums(values, window):
+    sums = np.concatenate([[0.0], np.cumsum(values)])
+    return sums[window:] - sums[:-window]
+
+
+def rolling_ols_beta(x, y, window, fit_intercept=False):
+    """
+    Slope of the least squares fit of y on x over every complete window,
+    the batch counterpart of RollingOLS: element i covers x[i:i + window].
+
+    Window sums come from cumulative sums, so the cost is O(n) whatever
+    the window length. With an intercept both series are first centred
+    on their overall mean, which leaves the slopes unchanged and keeps
+    the covariance terms from cancelling out.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    assert len(x) == len(y)
+    if len(x) < window:
+        return np.empty(0)
+
+    if not fit_intercept:
+        return _window_sums(x * y, window) / _window_sums(x * x, window)
+
+    x = x - x.mean()
+    y = y - y.mean()
+    sum_x = _window_sums(x, window)
+    sum_y = _window_sums(y, window)
+    sxy = _window_sums(x * y, window) - sum_x * sum_y / window
+    sxx = _window_sums(x * x, window) - sum_x * sum_x / window
+    return sxy / sxx
+
+
+class RollingVariance(Indicator):
+    """
+    Mean and variance (population by default, ddof=1 for the sample
+    variance) of the last window values, updated in O(1).
+
+    Sums are taken around the first value seen, which keeps the variance
+    from cancelling out when values are large compared to their spread.
+    """
+    def __init__(self, window, ddof=0):
+        self.window = window
+        self.ddof = ddof
+
+        self.values = deque()
+        self.shift = None
+        self.sum = 0.0
+        self.sum_sq = 0.0
+
+    def update(self, value):
+        if self.shift is None:
+            self.shift = value
+        self.values.append(value)
+        d = value - self.shift
+        self.sum += d
+        self.sum_sq += d * d
+
+        if len(self.values) > self.window:
+            d = self.values.popleft() - self.shift
+            self.sum -= d
+            self.sum_sq -= d * d
+
+    @property
+    def ready(self):
+        return len(self.values) == self.window
+
+    @property
+    def mean(self):
+        return self.shift + self.sum / len(self.values)
+
+    @property
+    def variance(self):
+        n = len(self.values)
+        return max(self.sum_sq - self.sum * self.sum / n, 0.0) / (n - self.ddof)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    @property
+    def value(self):
+        return self.variance
+
+
+class RollingZScore(RollingVariance):
+    """
+    Z-score of the latest value against the mean and standard deviation
+    (population by default) of the last window values.
+    """
+    @property
+    def value(self):
+        n = len(self.values)
+        return (self.values[-1] - self.shift - self.sum / n) / self.std
+
+
+class RollingMax(Indicator):
+    """
+    Maximum of the last window values. A deque of (position, value) kept
+    decreasing in value holds every candidate, so each value is pushed
+    and popped at most once.
+    """
+    def __init__(self, window):
+        self.window = window
+
+        self.count = 0
+        self.candidates = deque()
+
+    def _dominates(self, a, b):
+        return a >= b
+
+    def update(self, value):
+        candidates = self.candidates
+        while candidates and self._dominates(value, candidates[-1][1]):
+            candidates.pop()
+        candidates.append((self.count, value))
+        self.count += 1
+
+        if candidates[0][0] <= self.count - 1 - self.window:
+            candidates.popleft()
+
+    @property
+    def ready(self):
+        return self.count >= self.window
+
+    @property
+    def value(self):
+        return self.candidates[0][1]
+
+
+class RollingMin(RollingMax):
+    """
+    Minimum of the last window values, see RollingMax.
+    """
+    def _dominates(self, a, b):
+        return a <= b
@@ -2,10 +2,45 @@ import numpy as np
 import pandas as pd
 
 
-def create_sharpe_ratio(returns, periods=365 * 24 * 60 * 12): # for 5-min trading
+PERIODS_5MIN = 365 * 24 * 60 * 12
+
+
+def create_sharpe_ratio(returns, periods=PERIODS_5MIN): # for 5-min trading
     return np.sqrt(periods) * (np.mean(returns)) / np.std(returns)
 
 
+def create_drawdown_series(equity_curve):
+    """
+    Calculate the peak-to-trough drawdown of the PnL curve and the
+    number of periods spent in drawdown, for every period.
+
+    Parameters:
+    equity_curve - A pandas Series representing the equity curve.
+
+    Returns:
+    drawdown, duration - pandas Series on the equity curve index.
+    """
+    values = np.asarray(equity_curve, dtype=np.float64)
+    n = len(values)
+    drawdown = np.full(n, np.nan)
+    duration = np.full(n, np.nan)
+
+    # The first period has no return and is skipped, the High Water
+    # Mark starts at zero. Duration counts periods since the last time
+    # the curve was at its High Water Mark.
+    if n > 1:
+        hwm = np.fmax.accumulate(np.concatenate(([0.0], values[1:])))[1:]
+        drawdown[1:] = hwm - values[1:]
+
+        idx = np.arange(n - 1)
+        last_peak = np.maximum.accumulate(np.where(drawdown[1:] == 0, idx, -1))
+        duration[1:] = idx - last_peak
+        duration[1:][last_peak < 0] = np.nan
+
+    return (pd.Series(drawdown, index=equity_curve.index),
+            pd.Series(duration, index=equity_curve.index))
+
+
 def create_drawdowns(equity_curve):
     """
     Calculate the largest peak-to-trough drawdown of the PnL curve
@@ -18,19 +53,122 @@ def create_drawdowns(equity_curve):
     Returns:
     drawdown, duration - Highest peak-to-trough drawdown and duration.
     """
-
-    # Calculate the cumulative returns curve
-    # and set up the High Water Mark
-    # Then create the drawdown and duration series
-    hwm = [0]
-    eq_idx = equity_curve.index
-    drawdown = pd.Series(index=eq_idx)
-    duration = pd.Series(index=eq_idx)
-
-    # Loop over the index range
-    for t in range(1, len(eq_idx)):
-        cur_hwm = max(hwm[t - 1], equity_curve[t])
-        hwm.append(cur_hwm)
-        drawdown[t] = hwm[t] - equity_curve[t]
-        duration[t] = 0 if drawdown[t] == 0 else duration[t - 1] + 1
+    drawdown, duration = create_drawdown_series(equity_curve)
     return drawdown.max(), duration.max()
+
+
+def create_worst_drawdown(equity_curve):
+    """
+    Find the largest peak-to-trough drawdown of the PnL curve and when
+    it happened.
+
+    Parameters:
+    equity_curve - A pandas Series representing the equity curve.
+
+    Returns:
+    drawdown, start, end - Highest drawdown, index label of the peak it
+    started from and of the trough. start and end are None if the curve
+    never drew down.
+    """
+    drawdown, duration = create_drawdown_series(equity_curve)
+    max_dd = drawdown.max()
+    if not max_dd > 0:
+        return max_dd, None, None
+
+    end = int(np.nanargmax(drawdown.values))
+    periods = duration.values[end]
+    start = 1 if np.isnan(periods) else end - int(periods)
+    return max_dd, equity_curve.index[start], equity_curve.index[end]
+
+
+def format_summary_stats(total_return, sharpe_ratio, max_dd, dd_duration):
+    return [("Total Return", "%0.2f%%" % (total_return * 100.0)),
+            ("Sharpe Ratio", "%0.2f" % sharpe_ratio),
+            ("Max Drawdown", "%0.2f%%" % (max_dd * 100.0)),
+            ("Drawdown Duration", "%d" % dd_duration)
+            ]
+
+
+def create_summary_values(equity_curve):
+    """
+    Summary stats of an equity curve DataFrame with 'returns' and
+    'equity_curve' columns as floats, named as in output_summary_stats().
+    Total return and max drawdown are fractions, not percentages.
+    """
+    total_return = equity_curve['equity_curve'].iloc[-1]
+    sharpe_ratio = create_sharpe_ratio(equity_curve['returns'])
+    max_dd, dd_duration = create_drawdowns(equity_curve['equity_curve'])
+    return [("Total Return", float(total_return - 1.0)),
+            ("Sharpe Ratio", float(sharpe_ratio)),
+            ("Max Drawdown", float(max_dd)),
+            ("Drawdown Duration", float(dd_duration))
+            ]
+
+
+def create_summary_stats(equity_curve):
+    """
+    Summary stats of an equity curve DataFrame with 'returns' and
+    'equity_curve' columns, as reported by output_summary_stats().
+    """
+    return format_summary_stats(*[value for _, value in create_summary_values(equity_curve)])
+
+
+class OnlinePerformance(object):
+    """
+    Running total return, Sharpe ratio and drawdown of an equity curve
+    fed one portfolio total at a time, so stats can be read at any
+    moment without building the equity curve DataFrame.
+
+    Matches create_sharpe_ratio() and create_drawdowns() on the same
+    curve: returns are period percentage changes of the total (mean and
+    population variance kept with Welford's method), and the High Water
+    Mark starts at zero from the first return.
+    """
+    def __init__(self, periods=PERIODS_5MIN):
+        self.periods = periods
+
+        self.last_total = None
+        self.equity = 1.0
+
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+        self.hwm = 0.0
+        self.duration = None
+        self.max_drawdown = 0.0
+        self.max_duration = 0
+
+    def update(self, total):
+        last_total = self.last_total
+        self.last_total = total
+        if last_total is None:
+            return
+
+        ret = total / last_total - 1.0
+        self.equity *= 1.0 + ret
+
+        self.count += 1
+        delta = ret - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (ret - self.mean)
+
+        self.hwm = max(self.hwm, self.equity)
+        drawdown = self.hwm - self.equity
+        if drawdown == 0:
+            self.duration = 0
+        elif self.duration is not None:
+            self.duration += 1
+        self.max_drawdown = max(self.max_drawdown, drawdown)
+        if self.duration is not None:
+            self.max_duration = max(self.max_duration, self.duration)
+
+    @property
+    def total_return(self):
+        return self.equity - 1.0
+
+    @property
+    def sharpe_ratio(self):
+        std = np.sqrt(self.m2 / self.count) if self.count else np.nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.sqrt(self.periods) * np.float64(self.mean) / std
@@ -1,11 +1,12 @@
+import numpy as np
 import pandas as pd
 
 from abc import ABCMeta, abstractmethod
 from math import floor
 
-from .event import FillEvent, OrderEvent
+from .event import EventType, FillEvent, OrderEvent
 
-from .performance import create_sharpe_ratio, create_drawdowns
+from .performance import create_summary_stats, format_summary_stats, OnlinePerformance
 
 
 class Portfolio(object):
@@ -19,36 +20,106 @@ class Portfolio(object):
     def update_fill(self, event):
         raise NotImplementedError("Should implement update_fill()")
 
+    def update_fills(self, events):
+        """
+        Book a batch of fills, e.g. all those of one tick.
+        """
+        for event in events:
+            self.update_fill(event)
+
+
+class Ledger(object):
+    """
+    Time-indexed table of portfolio snapshots: one preallocated float64
+    column per field, written in place one row per time index. Capacity
+    grows in chunks, doubling each time it runs out.
+    """
+    CHUNK = 4096
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.data = np.empty((len(self.columns), self.CHUNK))
+        self.datetimes = []
+        self.length = 0
+
+    def append(self, dt, values):
+        n = self.length
+        if n == self.data.shape[1]:
+            data = np.empty((len(self.columns), 2 * n))
+            data[:, :n] = self.data
+            self.data = data
+        self.data[:, n] = values
+        self.datetimes.append(dt)
+        self.length = n + 1
+
+    def column(self, name):
+        return self.data[self.columns.index(name), :self.length]
+
+    def to_frame(self):
+        """
+        DataFrame over the filled rows. It shares memory with the ledger
+        rather than copying it.
+        """
+        return pd.DataFrame(
+            self.data[:, :self.length].T,
+            index=pd.Index(self.datetimes, name='datetime'),
+            columns=self.columns,
+            copy=False
+        )
+
+    def to_dicts(self):
+        return [
+            dict(zip(self.columns, self.data[:, i]), datetime=self.datetimes[i])
+            for i in range(self.length)
+        ]
+
 
 class NaivePortfolio(Portfolio):
-    def __init__(self, bars, events, start_date, initial_capital=100000.0):
+    DIRECTIONS = {'BUY': 1.0, 'SELL': -1.0}
+
+    def __init__(self, bars, events, start_date, initial_capital=100000.0, fee_schedule=None):
         self.bars = bars
         self.events = events
         self.symbol_list = self.bars.symbol_list
         self.start_date = start_date
         self.initial_capital = initial_capital
 
-        self.all_positions = self.construct_all_positions()
+        # Fills are charged from fee_schedule (see mikasa.fees) when set,
+        # otherwise at the commission rate each FillEvent carries
+        self.fee_schedule = fee_schedule
+        self.symbol_index = dict((s, i) for i, s in enumerate(self.symbol_list))
+
+        self.positions_ledger = self.construct_all_positions()
         self.current_positions = dict((k, v) for k, v in [(s, 0) for s in self.symbol_list])
 
-        self.all_holdings = self.construct_all_holdings()
+        self.holdings_ledger = self.construct_all_holdings()
         self.current_holdings = self.construct_current_holdings()
 
+        self.performance = OnlinePerformance()
+        self.performance.update(self.initial_capital)
+
         self.orders = []
         self.equity_curve = None
 
+    @property
+    def all_positions(self):
+        return self.positions_ledger.to_dicts()
+
+    @property
+    def all_holdings(self):
+        return self.holdings_ledger.to_dicts()
+
     def construct_all_positions(self):
-        d = dict((k, v) for k, v in [(s, 0) for s in self.symbol_list])
-        d['datetime'] = self.start_date
-        return [d]
+        ledger = Ledger(self.symbol_list)
+        ledger.append(self.start_date, 0.0)
+        return ledger
 
     def construct_all_holdings(self):
-        d = dict((k, v) for k, v in [(s, 0.0) for s in self.symbol_list])
-        d['datetime'] = self.start_date
-        d['cash'] = self.initial_capital
-        d['commission'] = 0.0
-        d['total'] = self.initial_capital
-        return [d]
+        ledger = Ledger(self.symbol_list + ['cash', 'commission', 'total'])
+        ledger.append(self.start_date, [0.0] * len(self.symbol_list) + [
+            self.initial_capital, 0.0, self.initial_capital
+        ])
+        return ledger
 
     def construct_current_holdings(self):
         d = dict((k, v) for k, v in [(s, 0.0) for s in self.symbol_list])
@@ -58,36 +129,29 @@ class NaivePortfolio(Portfolio):
         return d
 
     def update_timeindex(self, event):
-        latest_datetime = self.bars.get_latest_bars_values(
-            self.symbol_list[0],
-            'datetime'
-        )[0]
+        latest_datetime = self.bars.get_latest_datetime()
 
         # Update positions
         # ================
-        dp = dict((k, v) for k, v in [(s, 0) for s in self.symbol_list])
-        dp['datetime'] = latest_datetime
-        for s in self.symbol_list:
-            dp[s] = self.current_positions[s]
-
-        # Append the current positions
-        self.all_positions.append(dp)
+        positions = [self.current_positions[s] for s in self.symbol_list]
+        self.positions_ledger.append(latest_datetime, positions)
 
         # Update holdings
         # ===============
-        dh = dict((k, v) for k, v in [(s, 0) for s in self.symbol_list])
-        dh['datetime'] = latest_datetime
-        dh['cash'] = self.current_holdings['cash']
-        dh['commission'] = self.current_holdings['commission']
-        dh['total'] = self.current_holdings['cash']
-        for s in self.symbol_list:
-            # Approximation to the real value
-            market_value = self.current_positions[s] * \
-                           self.bars.get_latest_bars_values(s, "close")[0]
-            dh[s] = market_value
-            dh['total'] += market_value
-
-        self.all_holdings.append(dh)
+        # Approximation to the real value. Flat symbols are skipped, they
+        # may have no bars yet on a merged timeline.
+        row = [
+            quantity * self.bars.get_latest_bars_values(s, "close")[-1] if quantity else 0.0
+            for s, quantity in zip(self.symbol_list, positions)
+        ]
+        total = self.current_holdings['cash']
+        for market_value in row:
+            total += market_value
+        row.append(self.current_holdings['cash'])
+        row.append(self.current_holdings['commission'])
+        row.append(total)
+        self.holdings_ledger.append(latest_datetime, row)
+        self.performance.update(total)
 
     def update_positions_from_fill(self, fill):
         # Check whether the fill is a buy or sell
@@ -120,10 +184,51 @@ class NaivePortfolio(Portfolio):
         self.current_holdings['total'] -= (cost * (1.0 + fill.commission))
 
     def update_fill(self, event):
-        if event.type == 'FILL':
+        if event.type_id == EventType.FILL:
+            if self.fee_schedule is not None:
+                self.update_fills([event])
+                return
             self.update_positions_from_fill(event)
             self.update_holdings_from_fill(event)
 
+    def update_fills(self, events):
+        if self.fee_schedule is None:
+            super(NaivePortfolio, self).update_fills(events)
+            return
+
+        fills = [e for e in events if e.type_id == EventType.FILL]
+        if not fills:
+            return
+
+        symbols = np.array([self.symbol_index[f.symbol] for f in fills], dtype=np.int64)
+        direction = np.array([self.DIRECTIONS.get(f.direction, 0.0) for f in fills])
+        quantity = np.array([f.quantity for f in fills], dtype=np.float64)
+        price = np.array([
+            f.price if f.price else self.bars.get_latest_bars_values(f.symbol, 'close')[-1] for f in fills
+        ], dtype=np.float64)
+        cost = direction * price * quantity
+
+        # Fees are charged on the traded value whichever the side
+        rates = self.fee_schedule.rates(self.bars.get_latest_timestamp(), np.abs(cost),
+                                        np.array([f.maker for f in fills]),
+                                        np.array([f.exchange for f in fills], dtype=object))
+        commission = rates * np.abs(cost)
+        for fill, rate in zip(fills, rates):
+            fill.commission = rate
+
+        n = len(self.symbol_list)
+        traded = np.bincount(symbols, direction * quantity, minlength=n)
+        value = np.bincount(symbols, cost, minlength=n)
+        for i in np.unique(symbols):
+            s = self.symbol_list[i]
+            self.current_positions[s] += traded[i]
+            self.current_holdings[s] += value[i]
+
+        outflow = cost.sum() + commission.sum()
+        self.current_holdings['commission'] += commission.sum()
+        self.current_holdings['cash'] -= outflow
+        self.current_holdings['total'] -= outflow
+
     def generate_naive_order(self, signal):
         order = None
 
@@ -147,30 +252,109 @@ class NaivePortfolio(Portfolio):
         return order
 
     def update_signal(self, event):
-        if event.type == 'SIGNAL':
+        if event.type_id == EventType.SIGNAL:
             order_event = self.generate_naive_order(event)
             if order_event:
                 self.orders.append(order_event)
                 self.events.put(order_event)
 
     def create_equity_curve_dataframe(self):
-        curve = pd.DataFrame(self.all_holdings)
-        curve.set_index('datetime', inplace=True)
+        curve = self.holdings_ledger.to_frame()
         curve['returns'] = curve['total'].pct_change()
         curve['equity_curve'] = (1.0 + curve['returns']).cumprod()
         self.equity_curve = curve
 
     def output_summary_stats(self):
-        total_return = self.equity_curve['equity_curve'][-1]
-        returns = self.equity_curve['returns']
-        pnl = self.equity_curve['equity_curve']
-
-        sharpe_ratio = create_sharpe_ratio(returns)
-        max_dd, dd_duration = create_drawdowns(pnl)
-
-        stats = [("Total Return", "%0.2f%%" % ((total_return - 1.0) * 100.0)),
-                 ("Sharpe Ratio", "%0.2f" % sharpe_ratio),
-                 ("Max Drawdown", "%0.2f%%" % (max_dd * 100.0)),
-                 ("Drawdown Duration", "%d" % dd_duration)
-                 ]
-        return stats
\ No newline at end of file
+        return create_summary_stats(self.equity_curve)
+
+    def current_summary_stats(self):
+        """
+        Same stats as output_summary_stats(), taken from the running
+        metrics so they are available at any point of the run.
+        """
+        p = self.performance
+        return format_summary_stats(p.total_return, p.sharpe_ratio, p.max_drawdown, p.max_duration)
+
+
+class VectorizedPortfolio(NaivePortfolio):
+    """
+    NaivePortfolio accounting computed in one pass from whole position
+    arrays, for strategies that implement calculate_positions().
+
+    Fills happen at the close of the bar on which the target position
+    changes and are booked after that bar's holdings row, exactly as the
+    event-driven loop does, so both produce the same equity curve. With
+    a fee_schedule the trades of each bar are charged as one batch of
+    taker fills, as the event-driven loop books them.
+    """
+    COMMISSION = 0.002  # Same rate as FillEvent.calculate_commission()
+    EXCHANGE = 'BACKTEST'  # Exchange of the fills of SimulatedExecutionHandler
+
+    def __init__(self, bars, events, start_date, initial_capital=100000.0, fee_schedule=None):
+        super(VectorizedPortfolio, self).__init__(bars, events, start_date, initial_capital,
+                                                  fee_schedule=fee_schedule)
+        self.positions = None
+
+    def update_positions(self, positions):
+        """
+        positions - dict of symbol -> array of target positions held
+        after each bar; symbols that are missing stay flat.
+        """
+        self.positions = positions
+
+    def create_equity_curve_dataframe(self):
+        symbols = self.symbol_list
+        close = np.column_stack([self.bars.get_all_bars_values(s, 'close') for s in symbols])
+        n = close.shape[0]
+        positions = np.column_stack([
+            np.asarray(self.positions.get(s, np.zeros(n)), dtype=np.float64) for s in symbols
+        ])
+
+        trades = np.diff(positions, axis=0, prepend=0.0)
+        cost = (trades * close).sum(axis=1)
+        if self.fee_schedule is None:
+            fees = self.COMMISSION * cost
+        else:
+            fees = self._scheduled_fees(np.abs(trades * close))
+
+        # Row k holds the positions filled up to bar k - 1 valued at the close
+        # of bar k. The event loop replays the last bar once when the data runs
+        # out, hence the extra row priced at the final close.
+        held = np.vstack([np.zeros((1, len(symbols))), positions])
+        prices = np.vstack([close, close[-1:]])
+        cash = self.initial_capital - np.concatenate([[0.0], np.cumsum(cost + fees)])
+        commission = np.concatenate([[0.0], np.cumsum(fees)])
+
+        market_value = held * prices
+        curve = pd.DataFrame(market_value, columns=symbols)
+        curve['cash'] = cash
+        curve['commission'] = commission
+        curve['total'] = cash + market_value.sum(axis=1)
+
+        datetimes = self.bars.get_all_bars_values(symbols[0], 'datetime')
+        curve.index = pd.Index(datetimes + datetimes[-1:], name='datetime')
+        curve = pd.concat([self.holdings_ledger.to_frame(), curve])
+
+        curve['returns'] = curve['total'].pct_change()
+        curve['equity_curve'] = (1.0 + curve['returns']).cumprod()
+        self.equity_curve = curve
+
+    def _scheduled_fees(self, notional):
+        """
+        Fees of every bar from the notional traded per bar and symbol.
+        Schedules may depend on past volume, so bars with trades are
+        charged in order, one batch each.
+        """
+        timestamps = self.bars.get_all_bars_values(self.symbol_list[0], 'timestamp')
+        fees = np.zeros(notional.shape[0])
+        for k in np.flatnonzero((notional != 0).any(axis=1)):
+            traded = notional[k][notional[k] != 0]
+            rates = self.fee_schedule.rates(timestamps[k], traded, np.zeros(len(traded), dtype=bool),
+                                            np.full(len(traded), self.EXCHANGE, dtype=object))
+            fees[k] = np.dot(rates, traded)
+        return fees
+
+    def current_summary_stats(self):
+        # Positions arrive all at once, so there is nothing to stream
+        self.create_equity_curve_dataframe()
+        return self.output_summary_stats()
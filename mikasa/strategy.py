@@ -1,8 +1,30 @@
 import numpy as np
 import pandas as pd
 from abc import ABCMeta, abstractmethod
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .event import EventType, SignalEvent
+from .indicators import SMA, RollingOLS, RollingZScore
+
+
+def signals_to_positions(signals):
+    """
+    Turn an array of signals (1 = LONG, -1 = SHORT, 0 = EXIT, NaN = no
+    signal) into the positions NaivePortfolio would hold after each bar:
+    LONG/SHORT open a unit position only when flat and EXIT closes it.
+    """
+    signals = pd.Series(np.asarray(signals, dtype=np.float64))
+    idx = pd.Series(np.arange(len(signals), dtype=np.float64))
+
+    # Every EXIT starts a new segment; within a segment only the first
+    # entry signal opens a position, later ones are ignored.
+    segment = (signals == 0).cumsum()
+    entries = signals.abs() == 1
+    entry_side = signals.where(entries).groupby(segment).transform('first')
+    entry_idx = idx.where(entries).groupby(segment).transform('min')
+
+    return np.where(idx >= entry_idx, entry_side, 0.0)
 
-from .event import SignalEvent
 
 class Strategy(object):
     __metaclass__ = ABCMeta
@@ -11,6 +33,127 @@ class Strategy(object):
     def calculate_signals(self, queue):
         raise NotImplementedError("Should implement calculate_signals()")
 
+    def calculate_positions(self):
+        """
+        Vectorized counterpart of calculate_signals(): return a dict of
+        symbol -> array of positions held after each bar of the loaded
+        history. Used by VectorizedBacktest.
+        """
+        raise NotImplementedError("Should implement calculate_positions()")
+
+    def fit(self, bars):
+        """
+        Called by WalkForward before each test window with a data handler
+        over the preceding training window. Does nothing by default.
+        """
+        pass
+
+
+class PredictionStrategy(Strategy):
+    """
+    Base class for strategies that trade on a model's predictions from
+    features of the last `window` bars of each symbol.
+
+    On historical data the features of every bar are built at once from
+    sliding windows over the loaded history. They are predicted in a
+    single batched call the first time signals are calculated, and each
+    tick then looks its prediction up. Live handlers have no history to
+    precompute, so each tick predicts one batch covering every symbol
+    with a new bar.
+
+    Subclasses set fields and window, implement make_features() and
+    on_prediction(), and either set model or override predict().
+    Features must only depend on the bars inside each window.
+    """
+    fields = ['close']
+    window = 1
+
+    def __init__(self, bars, queue):
+        self.bars = bars
+        self.symbol_list = self.bars.symbol_list
+        self.queue = queue
+
+        depth = self.bars.bar_store.depth
+        for s in self.symbol_list:
+            if depth[s] is not None and depth[s] < self.window:
+                raise ValueError("history_depth of %s is %d, shorter than the window of %d bars" %
+                                 (s, depth[s], self.window))
+
+        # symbol -> prediction of every complete window of the history
+        self.predictions = None
+        self.latest_index = dict((s, -1) for s in self.symbol_list)
+
+    @abstractmethod
+    def make_features(self, windows):
+        """
+        Return the feature rows of a batch of samples. windows maps each
+        of fields to an array of shape (samples, window), oldest bar first.
+        """
+        raise NotImplementedError("Should implement make_features()")
+
+    @abstractmethod
+    def on_prediction(self, symbol, dt, prediction):
+        """
+        Put the signals for the prediction of the latest bar of symbol.
+        """
+        raise NotImplementedError("Should implement on_prediction()")
+
+    def predict(self, X):
+        return self.model.predict(X)
+
+    def precompute_predictions(self):
+        features = []
+        for s in self.symbol_list:
+            values = [np.asarray(self.bars.get_all_bars_values(s, f)) for f in self.fields]
+            if len(values[0]) < self.window:
+                features.append(None)
+                continue
+            windows = dict((f, sliding_window_view(v, self.window)) for f, v in zip(self.fields, values))
+            features.append(self.make_features(windows))
+
+        # One call for every bar of every symbol
+        X = [f for f in features if f is not None]
+        predictions = self.predict(np.concatenate(X)) if X else []
+
+        self.predictions = {}
+        offset = 0
+        for s, f in zip(self.symbol_list, features):
+            n = 0 if f is None else len(f)
+            self.predictions[s] = predictions[offset:offset + n]
+            offset += n
+
+    def calculate_signals(self, event):
+        if event.type_id == EventType.MARKET:
+            if self.predictions is None and not self.bars.live:
+                self.precompute_predictions()
+
+            # Symbols with a complete window that moved since the last tick
+            store = self.bars.bar_store
+            symbols = []
+            for s in self.symbol_list:
+                index = store.count[s] - 1
+                if index >= self.window - 1 and index != self.latest_index[s]:
+                    self.latest_index[s] = index
+                    symbols.append(s)
+            if not symbols:
+                return
+
+            if self.predictions is not None:
+                predictions = [self.predictions[s][self.latest_index[s] - self.window + 1] for s in symbols]
+            else:
+                X = [
+                    self.make_features(dict(
+                        (f, np.asarray(self.bars.get_latest_bars_values(s, f, N=self.window))[None, :])
+                        for f in self.fields
+                    ))
+                    for s in symbols
+                ]
+                predictions = self.predict(np.concatenate(X))
+
+            for s, prediction in zip(symbols, predictions):
+                dt = self.bars.get_latest_bars_values(s, 'datetime')[-1]
+                self.on_prediction(s, dt, prediction)
+
 
 class BuyAndHoldStrategy(Strategy):
     def __init__(self, bars, queue):
@@ -28,7 +171,7 @@ class BuyAndHoldStrategy(Strategy):
         return bought
 
     def calculate_signals(self, event):
-        if event.type == 'MARKET':
+        if event.type_id == EventType.MARKET:
             for s in self.symbol_list:
                 bars = self.bars.get_latest_bars(s, N=1)
                 if bars is not None and bars != []:
@@ -43,6 +186,12 @@ class BuyAndHoldStrategy(Strategy):
                         self.queue.put(signal)
                         self.bought[s] = True
 
+    def calculate_positions(self):
+        return dict(
+            (s, np.ones(len(self.bars.get_all_bars_values(s, 'timestamp'))))
+            for s in self.symbol_list
+        )
+
 
 class SMAStrategy(Strategy):
     def __init__(self, bars, queue, period=50):
@@ -50,23 +199,43 @@ class SMAStrategy(Strategy):
         self.queue = queue
         self.period = period
 
-    def calculate_signals(self, event):
-        if event.type == 'MARKET':
-            if self.bars.index > self.period:
+        self.symbol = self.bars.symbol_list[0]
+        self.sma = self.bars.register_indicator(self.symbol, SMA, period=period)
 
-                data = self.bars.get_latest_bars(self.bars.symbol_list[0], 10*self.period)
+        # Close and SMA of the previous bar, once the SMA is ready
+        self.previous = None
 
-                data = pd.DataFrame(data)
-                data.set_index('datetime', inplace=True)
+    def calculate_signals(self, event):
+        if event.type_id == EventType.MARKET:
+            if not self.sma.ready:
+                return
 
-                sma = data['close'].rolling(center=False, window=self.period).mean()
+            close = self.bars.get_latest_bars_values(self.symbol, 'close')[-1]
+            sma = self.sma.value
 
-                if data.iloc[-1]['close'] > sma[-1] and data.iloc[-2]['close'] <= sma[-2]:
-                    signal = SignalEvent(self.bars.symbol_list[0], data.iloc[-1]['close'], 'LONG', 1.0)
+            if self.previous is not None:
+                previous_close, previous_sma = self.previous
+                dt = self.bars.get_latest_datetime()
+                if close > sma and previous_close <= previous_sma:
+                    signal = SignalEvent('SMA', self.symbol, dt, 'LONG', 1.0)
                     self.queue.put(signal)
-                if data.iloc[-1]['close'] < sma[-1] and data.iloc[-2]['close'] >= sma[-2]:
-                    signal = SignalEvent(self.bars.symbol_list[0], data.iloc[-1]['close'], 'EXIT', 1.0)
+                if close < sma and previous_close >= previous_sma:
+                    signal = SignalEvent('SMA', self.symbol, dt, 'EXIT', 1.0)
                     self.queue.put(signal)
+            self.previous = (close, sma)
+
+    def calculate_positions(self):
+        symbol = self.bars.symbol_list[0]
+        close = pd.Series(self.bars.get_all_bars_values(symbol, 'close'))
+        sma = close.rolling(center=False, window=self.period).mean()
+
+        cross_up = (close > sma) & (close.shift(1) <= sma.shift(1))
+        cross_down = (close < sma) & (close.shift(1) >= sma.shift(1))
+        signals = np.where(cross_up, 1.0, np.where(cross_down, 0.0, np.nan))
+
+        positions = dict((s, np.zeros(len(close))) for s in self.bars.symbol_list)
+        positions[symbol] = signals_to_positions(signals)
+        return positions
 
 
 class StatArbitrageStrategy(Strategy):
@@ -75,55 +244,62 @@ class StatArbitrageStrategy(Strategy):
     Z_EXIT_THRESHOLD = 1.0
     WINDOW = 900
 
-    def __init__(self, bars, queue):
+    def __init__(self, bars, queue, look_back=LOOK_BACK, z_entry_threshold=Z_ENTRY_THRESHOLD,
+                 z_exit_threshold=Z_EXIT_THRESHOLD, window=WINDOW):
         self.bars = bars
         self.symbol_list = self.bars.symbol_list
         self.queue = queue
 
+        self.LOOK_BACK = look_back
+        self.Z_ENTRY_THRESHOLD = z_entry_threshold
+        self.Z_EXIT_THRESHOLD = z_exit_threshold
+        self.WINDOW = window
+
+        # Hedge ratio of each bar is fitted on the WINDOW bars before it and
+        # the z-score taken over the spreads of the rest of the look-back
+        self.ols = RollingOLS(self.WINDOW)
+        self.spread = RollingZScore(self.LOOK_BACK - self.WINDOW)
+        self.hedge_ratio = None
+        self.zscore = None
+        self.index = 0
+        self.timestamp = None
+
     def calculate_signals(self, event):
-        print(self.bars.index)
-        if event.type == 'MARKET':
+        if event.type_id == EventType.MARKET:
             s0 = 'BTC_ETC'
             s1 = 'BTC_LTC'
-            if self.bars.index > self.LOOK_BACK:
-
-                X = self.bars.get_latest_bars(s0, self.LOOK_BACK)
-                Y = self.bars.get_latest_bars(s1, self.LOOK_BACK)
-
-                X = pd.DataFrame(X)
-                X.set_index('datetime', inplace=True)
-                Y = pd.DataFrame(Y)
-                Y.set_index('datetime', inplace=True)
 
-                ols = rolling_sm_ols(Y['close'], X['close'], X.index, window=self.WINDOW)
-                # ols = sm.OLS(Y['close'].values, X['close'].values).fit()
-                # print(ols.params)
+            # The final bar is replayed once when the data runs out
+            timestamp = self.bars.get_latest_timestamp()
+            if timestamp == self.timestamp:
+                return
+            self.timestamp = timestamp
+            self.index += 1
 
-                # ols = rolling_beta(X['close'], Y['close'], X.index, window=self.LOOK_BACK)
-                pairs = pd.concat([X['close'], Y['close']], axis=1, keys=['{}_close'.format(s0), '{}_close'.format(s1)])
+            current_x_close = self.bars.get_latest_bars_values(s0, 'close')[-1]
+            current_y_close = self.bars.get_latest_bars_values(s1, 'close')[-1]
 
-                pairs['hedge_ratio'] = ols['beta']
-                pairs.dropna(inplace=True)
+            if self.ols.ready:
+                self.hedge_ratio = self.ols.beta
+                self.spread.update(current_x_close - self.hedge_ratio * current_y_close)
+            self.ols.update(current_x_close, current_y_close)
 
-                pairs['hedge_ratio'] = [v for v in pairs['hedge_ratio'].values]
-                pairs['spread'] = pairs['{}_close'.format(s0)] - pairs['hedge_ratio'] * pairs['{}_close'.format(s1)]
-                pairs['zscore'] = (pairs['spread'] - np.mean(pairs['spread'])) / np.std(pairs['spread'])
-                current_zscore = pairs.iloc[-1]['zscore']
-                current_x_close = pairs.iloc[-1]['{}_close'.format(s0)]
-                current_y_close = pairs.iloc[-1]['{}_close'.format(s1)]
+            if self.index > self.LOOK_BACK:
+                dt = self.bars.get_latest_datetime()
+                self.zscore = current_zscore = self.spread.value
 
                 if current_zscore <= -self.Z_ENTRY_THRESHOLD:
-                    signal = SignalEvent(s0, current_x_close, 'LONG', 1.0)
+                    signal = SignalEvent('STAT_ARB', s0, dt, 'LONG', 1.0)
                     self.queue.put(signal)
-                    signal = SignalEvent(s1, current_y_close, 'SHORT', 1.0)
+                    signal = SignalEvent('STAT_ARB', s1, dt, 'SHORT', 1.0)
                     self.queue.put(signal)
                 elif current_zscore >= self.Z_ENTRY_THRESHOLD:
-                    signal = SignalEvent(s0, current_x_close, 'SHORT', 1.0)
+                    signal = SignalEvent('STAT_ARB', s0, dt, 'SHORT', 1.0)
                     self.queue.put(signal)
-                    signal = SignalEvent(s1, current_y_close, 'LONG', 1.0)
+                    signal = SignalEvent('STAT_ARB', s1, dt, 'LONG', 1.0)
                     self.queue.put(signal)
                 elif current_zscore <= self.Z_EXIT_THRESHOLD:
-                    signal = SignalEvent(s0, current_x_close, 'EXIT', 1.0)
+                    signal = SignalEvent('STAT_ARB', s0, dt, 'EXIT', 1.0)
                     self.queue.put(signal)
-                    signal = SignalEvent(s1, current_y_close, 'EXIT', 1.0)
+                    signal = SignalEvent('STAT_ARB', s1, dt, 'EXIT', 1.0)
                     self.queue.put(signal)
@@ -0,0 +1,139 @@
+import itertools
+import multiprocessing
+import random
+
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor
+
+from .backtest import Backtest
+from .event import DequeEventBus
+from .performance import create_summary_values
+
+# Bars loaded once by the parent process and handed to every worker
+_bar_store = None
+
+
+def _init_worker(bar_store):
+    global _bar_store
+    _bar_store = bar_store
+
+
+def process_pool(bar_store, max_workers=None):
+    """
+    ProcessPoolExecutor whose workers can read bar_store through
+    shared_bar_store(). Uses the fork start method where available so
+    the arrays are shared copy-on-write instead of pickled.
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                               initializer=_init_worker, initargs=(bar_store,))
+
+
+def shared_bar_store():
+    return _bar_store
+
+
+def _run_backtest(backtest_cls, backtest_params, strategy_params):
+    backtest = backtest_cls(strategy_params=strategy_params, bar_store=_bar_store, **backtest_params)
+    backtest._run_backtest()
+    backtest.portfolio.create_equity_curve_dataframe()
+    result = dict(strategy_params)
+    result.update(create_summary_values(backtest.portfolio.equity_curve))
+    return result
+
+
+class ParameterSweep(object):
+    """
+    Runs one Backtest per combination of strategy parameters over a
+    process pool and collects the summary stats of each run into a
+    DataFrame. The stats are kept as floats (see create_summary_values())
+    so runs can be sorted and ranked by them.
+
+    The CSV files are read once in the parent. Workers receive the
+    loaded bar store at start-up: with the fork start method they share
+    its arrays copy-on-write, otherwise it is pickled once per worker.
+    """
+    def __init__(self,
+                 csv_dir,
+                 symbol_list,
+                 initial_capital,
+                 start_date,
+                 data_handler,
+                 execution_handler,
+                 portfolio,
+                 strategy,
+                 fields,
+                 ticks_limit=None,
+                 end_date=None,
+                 filter_dates=False,
+                 backtest=Backtest,
+                 max_workers=None,
+                 data_handler_params=None
+                 ):
+        self.backtest_cls = backtest
+        self.backtest_params = {
+            'csv_dir': csv_dir,
+            'symbol_list': symbol_list,
+            'initial_capital': initial_capital,
+            'heartbeat': 0.0,
+            'start_date': start_date,
+            'data_handler': data_handler,
+            'execution_handler': execution_handler,
+            'portfolio': portfolio,
+            'strategy': strategy,
+            'fields': fields,
+            'ticks_limit': ticks_limit,
+            'end_date': end_date,
+            'filter_dates': filter_dates,
+            'data_handler_params': data_handler_params,
+        }
+        self.max_workers = max_workers
+
+        load_params = {}
+        if end_date is not None or filter_dates:
+            load_params = {'start_date': start_date, 'end_date': end_date}
+        load_params.update(data_handler_params or {})
+        self.bar_store = data_handler(DequeEventBus(), csv_dir, symbol_list, fields, limit=ticks_limit,
+                                      **load_params).bar_store
+
+    def grid(self, param_grid):
+        """
+        All combinations of a dict of parameter name -> list of values.
+        """
+        names = sorted(param_grid)
+        return [dict(zip(names, values)) for values in itertools.product(*[param_grid[n] for n in names])]
+
+    def sample(self, param_distributions, n_iter, seed=None):
+        """
+        n_iter random combinations of a dict of parameter name -> list of
+        values or a callable taking a random.Random instance.
+        """
+        rng = random.Random(seed)
+        names = sorted(param_distributions)
+        params = []
+        for _ in range(n_iter):
+            p = {}
+            for n in names:
+                d = param_distributions[n]
+                p[n] = d(rng) if callable(d) else rng.choice(d)
+            params.append(p)
+        return params
+
+    def run(self, param_sets):
+        with process_pool(self.bar_store, self.max_workers) as executor:
+            futures = [
+                executor.submit(_run_backtest, self.backtest_cls, self.backtest_params, p)
+                for p in param_sets
+            ]
+            results = [f.result() for f in futures]
+        return pd.DataFrame(results)
+
+    def run_grid(self, param_grid):
+        return self.run(self.grid(param_grid))
+
+    def run_random(self, param_distributions, n_iter, seed=None):
+        return self.run(self.sample(param_distributions, n_iter, seed))
@@ -0,0 +1,158 @@
+import datetime
+
+import pandas as pd
+
+from .backtest import Backtest
+from .event import DequeEventBus
+from .performance import create_summary_stats, create_summary_values
+from .sweep import process_pool, shared_bar_store
+
+
+def _run_window(backtest_cls, backtest_params, strategy_params, train, test):
+    bar_store = shared_bar_store()
+    backtest = backtest_cls(strategy_params=strategy_params,
+                            bar_store=bar_store.between(*test),
+                            start_date=datetime.datetime.fromtimestamp(test[0]),
+                            **backtest_params)
+
+    train_bars = backtest.data_handler_cls(DequeEventBus(), backtest.csv_dir, backtest.symbol_list,
+                                           backtest.fields, bar_store=bar_store.between(*train),
+                                           **backtest.data_handler_params)
+    backtest.strategy.fit(train_bars)
+
+    backtest._run_backtest()
+    backtest.portfolio.create_equity_curve_dataframe()
+    return backtest.portfolio.equity_curve, create_summary_values(backtest.portfolio.equity_curve)
+
+
+class WalkForwardReport(object):
+    """
+    Outcome of a walk-forward run.
+
+    windows - DataFrame with the train/test bounds and the summary stats
+    of every test window as floats (see create_summary_values()).
+    equity_curve - test window returns stitched end to end, one row per
+    timestamp, with the equity curve compounded across windows.
+    stats - summary stats of the stitched equity curve.
+    """
+    def __init__(self, windows, equity_curve, stats):
+        self.windows = windows
+        self.equity_curve = equity_curve
+        self.stats = stats
+
+
+class WalkForward(object):
+    """
+    Walk-forward evaluation: the loaded bars are split into consecutive
+    train/test windows of train_size and test_size bars, moving by step
+    bars (test_size by default). With anchored=True every training
+    window starts at the first bar instead of sliding.
+
+    Each test window runs as an independent Backtest, in parallel over a
+    process pool, after the strategy's fit() has been given a data
+    handler over its training window.
+    """
+    def __init__(self,
+                 csv_dir,
+                 symbol_list,
+                 initial_capital,
+                 data_handler,
+                 execution_handler,
+                 portfolio,
+                 strategy,
+                 fields,
+                 train_size,
+                 test_size,
+                 step=None,
+                 anchored=False,
+                 start_date=None,
+                 end_date=None,
+                 ticks_limit=None,
+                 strategy_params=None,
+                 backtest=Backtest,
+                 max_workers=None,
+                 data_handler_params=None
+                 ):
+        self.train_size = train_size
+        self.test_size = test_size
+        self.step = step or test_size
+        self.anchored = anchored
+        self.strategy_params = strategy_params or {}
+        self.backtest_cls = backtest
+        self.backtest_params = {
+            'csv_dir': csv_dir,
+            'symbol_list': symbol_list,
+            'initial_capital': initial_capital,
+            'heartbeat': 0.0,
+            'data_handler': data_handler,
+            'execution_handler': execution_handler,
+            'portfolio': portfolio,
+            'strategy': strategy,
+            'fields': fields,
+            'data_handler_params': data_handler_params,
+        }
+        self.max_workers = max_workers
+
+        # Handlers without date bounds still work when none are given
+        load_params = {}
+        if start_date is not None or end_date is not None:
+            load_params = {'start_date': start_date, 'end_date': end_date}
+        load_params.update(data_handler_params or {})
+        self.bar_store = data_handler(DequeEventBus(), csv_dir, symbol_list, fields, limit=ticks_limit,
+                                      **load_params).bar_store
+
+    def windows(self):
+        """
+        List of ((train_start, train_end), (test_start, test_end))
+        timestamp ranges, ends exclusive.
+        """
+        timeline = self.bar_store.timeline()
+        # Sentinel end for a window that reaches the last bar
+        bounds = list(timeline) + [timeline[-1] + 1] if len(timeline) else []
+
+        windows = []
+        start = 0
+        while start + self.train_size + self.test_size <= len(timeline):
+            train_start = 0 if self.anchored else start
+            test_start = start + self.train_size
+            test_end = test_start + self.test_size
+            windows.append(((bounds[train_start], bounds[test_start]),
+                            (bounds[test_start], bounds[test_end])))
+            start += self.step
+        return windows
+
+    def run(self):
+        windows = self.windows()
+        if not windows:
+            raise ValueError("Not enough bars for a single train/test window")
+        with process_pool(self.bar_store, self.max_workers) as executor:
+            futures = [
+                executor.submit(_run_window, self.backtest_cls, self.backtest_params,
+                                self.strategy_params, train, test)
+                for train, test in windows
+            ]
+            results = [f.result() for f in futures]
+
+        rows = []
+        # Start from the first window's initial capital row, then chain the
+        # returns of every window after its own initial row
+        returns = [results[0][0]['returns'].iloc[:1]]
+        for (train, test), (equity_curve, stats) in zip(windows, results):
+            row = {
+                'train_start': datetime.datetime.fromtimestamp(train[0]),
+                'train_end': datetime.datetime.fromtimestamp(train[1]),
+                'test_start': datetime.datetime.fromtimestamp(test[0]),
+                'test_end': datetime.datetime.fromtimestamp(test[1]),
+            }
+            row.update(stats)
+            rows.append(row)
+            returns.append(equity_curve['returns'].iloc[1:])
+
+        # A run's initial row shares the first bar's timestamp and its last
+        # bar is replayed when the data runs out: merge rows of the same
+        # timestamp into one, compounding their returns
+        growth = (1.0 + pd.concat(returns)).groupby(level=0, sort=False).prod()
+        curve = pd.DataFrame({'returns': growth - 1.0})
+        curve['equity_curve'] = growth.cumprod()
+
+        return WalkForwardReport(pd.DataFrame(rows), curve, create_summary_stats(curve))
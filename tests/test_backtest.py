@@ -1,12 +1,20 @@
+import os
+import shutil
+import tempfile
+
 from datetime import datetime
 
+import numpy as np
+
 from unittest import TestCase
 
-from backtest import Backtest
-from data import HistoricCSVDataHandler
-from execution import SimulatedExecutionHandler
-from portfolio import NaivePortfolio
-from strategy import BuyAndHoldStrategy
+from mikasa.backtest import Backtest, ReplayScheduler, VectorizedBacktest
+from mikasa.data import HistoricCSVDataHandler
+from mikasa.execution import SimulatedExecutionHandler
+from mikasa.fill import NextBarOpenFillModel
+from mikasa.fees import TieredFee
+from mikasa.portfolio import NaivePortfolio, VectorizedPortfolio
+from mikasa.strategy import BuyAndHoldStrategy, SMAStrategy
 
 
 class BacktestTestCase(TestCase):
@@ -61,3 +69,223 @@ class BacktestTestCase(TestCase):
                                  ('Sharpe Ratio', '-17.72'),
                                  ('Max Drawdown', '0.00%'),
                                  ('Drawdown Duration', '2000')])
+
+    def test_vectorized_matches_event_driven(self):
+        self._assert_vectorized_matches_event_driven(BuyAndHoldStrategy)
+
+    def test_sma_vectorized_matches_event_driven(self):
+        self._assert_vectorized_matches_event_driven(SMAStrategy, {'period': 20})
+
+    def test_fee_schedule_vectorized_matches_event_driven(self):
+        def fee_schedule():
+            return TieredFee([(0.0, 0.002, 0.003), (0.05, 0.001, 0.0015)])
+
+        self._assert_vectorized_matches_event_driven(SMAStrategy, {'period': 20}, fee_schedule)
+
+    def _assert_vectorized_matches_event_driven(self, strategy_cls, strategy_params=None, fee_schedule=None):
+        csv_dir = './tests/datasets/'
+        symbol_list = ['BTC_ETC', 'BTC_LTC']
+        start_date = datetime(2017, 4, 21, 0, 0, 1)
+        results = []
+        for backtest_cls, portfolio_cls in ((Backtest, NaivePortfolio),
+                                            (VectorizedBacktest, VectorizedPortfolio)):
+            backtest = backtest_cls(
+                csv_dir,
+                symbol_list,
+                1000.0,
+                0.0,
+                start_date,
+                HistoricCSVDataHandler,
+                SimulatedExecutionHandler,
+                portfolio_cls,
+                strategy_cls,
+                fields=['open', 'high', 'low', 'close'],
+                ticks_limit=500,
+                strategy_params=strategy_params,
+                portfolio_params={'fee_schedule': fee_schedule()} if fee_schedule else None
+            )
+            backtest._run_backtest()
+            backtest.portfolio.create_equity_curve_dataframe()
+            results.append(backtest.portfolio)
+
+        event_driven, vectorized = results
+        self.assertEqual(len(event_driven.equity_curve), len(vectorized.equity_curve))
+        self.assertEqual(list(event_driven.equity_curve.index), list(vectorized.equity_curve.index))
+        for column in ('BTC_ETC', 'BTC_LTC', 'cash', 'commission', 'total'):
+            for a, b in zip(event_driven.equity_curve[column], vectorized.equity_curve[column]):
+                self.assertAlmostEqual(a, b, places=9)
+        self.assertEqual(event_driven.output_summary_stats(), vectorized.output_summary_stats())
+        self.assertEqual(event_driven.current_summary_stats(), event_driven.output_summary_stats())
+
+    def test_recycle_events(self):
+        results = []
+        for recycle_events in (False, True):
+            backtest = Backtest(
+                './tests/datasets/',
+                ['BTC_ETC', 'BTC_LTC'],
+                1000.0,
+                0.0,
+                datetime(2017, 4, 21, 0, 0, 1),
+                HistoricCSVDataHandler,
+                SimulatedExecutionHandler,
+                NaivePortfolio,
+                SMAStrategy,
+                fields=['open', 'high', 'low', 'close'],
+                ticks_limit=300,
+                strategy_params={'period': 20},
+                recycle_events=recycle_events
+            )
+            backtest._run_backtest()
+            backtest.portfolio.create_equity_curve_dataframe()
+            results.append((backtest.signals, backtest.orders, backtest.fills,
+                            list(backtest.portfolio.equity_curve['total'])))
+
+        self.assertEqual(results[0], results[1])
+        self.assertTrue(results[1][2] > 0)
+        # A single MarketEvent served every tick
+        self.assertEqual(len(backtest.event_pool._free), 1)
+
+    def test_fill_model(self):
+        backtest = Backtest(
+            './tests/datasets/',
+            ['BTC_ETC', ],
+            1000.0,
+            0.0,
+            datetime(2017, 4, 21, 0, 0, 1),
+            HistoricCSVDataHandler,
+            SimulatedExecutionHandler,
+            NaivePortfolio,
+            SMAStrategy,
+            fields=['open', 'high', 'low', 'close'],
+            ticks_limit=300,
+            strategy_params={'period': 20},
+            execution_params={'fill_model': NextBarOpenFillModel()}
+        )
+        backtest._run_backtest()
+
+        # Every order but one placed on the last bar fills at the next open
+        self.assertTrue(backtest.orders > 0)
+        self.assertIn(backtest.fills, (backtest.orders, backtest.orders - 1))
+        self.assertEqual(backtest.fills + len(backtest.execution_handler.order_book), backtest.orders)
+
+    def test_data_handler_params(self):
+        curves = []
+        for data_handler_params in (None, {'history_depth': 30}):
+            backtest = Backtest(
+                './tests/datasets/',
+                ['BTC_ETC', ],
+                1000.0,
+                0.0,
+                datetime(2017, 4, 21, 0, 0, 1),
+                HistoricCSVDataHandler,
+                SimulatedExecutionHandler,
+                NaivePortfolio,
+                SMAStrategy,
+                fields=['open', 'high', 'low', 'close'],
+                ticks_limit=300,
+                strategy_params={'period': 20},
+                data_handler_params=data_handler_params
+            )
+            backtest._run_backtest()
+            backtest.portfolio.create_equity_curve_dataframe()
+            curves.append(list(backtest.portfolio.equity_curve['total']))
+
+        self.assertEqual(backtest.data_handler.history_depth, 30)
+        self.assertEqual(len(backtest.data_handler.get_latest_bars_values('BTC_ETC', 'close', N=100)), 30)
+        # The SMA window fits in the depth, so the run is unchanged
+        self.assertEqual(curves[0], curves[1])
+
+    def test_overridden_trading_instances(self):
+        class CustomBacktest(Backtest):
+            def _generate_trading_instances(self):
+                self.data_handler = self.data_handler_cls(self.events, self.csv_dir,
+                                                          self.symbol_list, self.fields, limit=50)
+                self.strategy = self.strategy_cls(self.data_handler, self.events)
+                self.portfolio = self.portfolio_cls(self.data_handler, self.events,
+                                                    self.start_date, self.initial_capital)
+                self.execution_handler = self.execution_handler_cls(self.events, self.portfolio)
+
+        backtest = CustomBacktest(
+            './tests/datasets/',
+            ['BTC_ETC', ],
+            1000.0,
+            0.0,
+            datetime(2017, 4, 21, 0, 0, 1),
+            HistoricCSVDataHandler,
+            SimulatedExecutionHandler,
+            NaivePortfolio,
+            BuyAndHoldStrategy,
+            fields=['open', 'high', 'low', 'close']
+        )
+        backtest._run_backtest()
+        self.assertEqual(backtest.signals, 1)
+        self.assertEqual(backtest.fills, 1)
+
+    def test_symbols_starting_later(self):
+        csv_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, csv_dir)
+        for s, first in (('A', 1492875000), ('B', 1492875000 + 300 * 10)):
+            with open(os.path.join(csv_dir, '%s.csv' % s), 'w') as f:
+                f.write('datetime,open,high,low,close\n')
+                for i in range(30):
+                    f.write('%d,1.0,1.0,1.0,%s\n' % (first + 300 * i, 1.0 + i))
+
+        backtest = Backtest(
+            csv_dir,
+            ['A', 'B'],
+            1000.0,
+            0.0,
+            datetime(2017, 4, 21, 0, 0, 1),
+            HistoricCSVDataHandler,
+            SimulatedExecutionHandler,
+            NaivePortfolio,
+            BuyAndHoldStrategy,
+            fields=['open', 'high', 'low', 'close']
+        )
+        backtest._run_backtest()
+        backtest.portfolio.create_equity_curve_dataframe()
+        self.assertEqual(backtest.fills, 2)
+        self.assertTrue(np.isfinite(backtest.portfolio.equity_curve['total']).all())
+
+    def test_date_bounds(self):
+        class LegacyDataHandler(HistoricCSVDataHandler):
+            def __init__(self, events, csv_dir, symbol_list, fields, limit=None):
+                super(LegacyDataHandler, self).__init__(events, csv_dir, symbol_list, fields, limit=limit)
+
+        params = dict(
+            csv_dir='./tests/datasets/',
+            symbol_list=['BTC_ETC', ],
+            initial_capital=1000.0,
+            heartbeat=0.0,
+            start_date=datetime(2030, 1, 1),
+            execution_handler=SimulatedExecutionHandler,
+            portfolio=NaivePortfolio,
+            strategy=BuyAndHoldStrategy,
+            fields=['open', 'high', 'low', 'close'],
+            ticks_limit=50
+        )
+        # start_date alone labels the first holdings row and loads every bar
+        for data_handler in (HistoricCSVDataHandler, LegacyDataHandler):
+            backtest = Backtest(data_handler=data_handler, **params)
+            self.assertEqual(len(backtest.data_handler.bar_store.get_values('BTC_ETC', 'close')), 50)
+
+        with self.assertRaises(ValueError):
+            Backtest(data_handler=HistoricCSVDataHandler, filter_dates=True, **params)
+
+    def test_replay_scheduler(self):
+        clock = [100.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            clock[0] += seconds
+
+        scheduler = ReplayScheduler(speed=60.0, clock=lambda: clock[0], sleep=sleep)
+        scheduler.wait(1492875000)
+        scheduler.wait(1492875300)
+        clock[0] += 10.0
+        scheduler.wait(1492875600)
+        clock[0] += 20.0
+        scheduler.wait(1492875900)
+
+        self.assertEqual(sleeps, [5.0])
@@ -1,7 +1,16 @@
+import os
 import queue
+import shutil
+import sys
+import tempfile
+
+from datetime import datetime
+
+import numpy as np
 
 from unittest import TestCase
-from data import HistoricCSVDataHandler
+from unittest.mock import patch
+from mikasa.data import BarStore, HistoricCSVDataHandler, MergedCSVDataHandler, load_bars
 
 
 class DataHandlerTestCase(TestCase):
@@ -30,4 +39,175 @@ class DataHandlerTestCase(TestCase):
         self.assertEqual(data.get_latest_bars_values(s, 'datetime')[0], d.datetime)
         self.assertEqual(round(data.get_latest_bars_values(s, 'open')[0], 8), 0.00258999)
         values = data.get_latest_bars_values(s, 'open')
-        self.assertEqual(round(values[0], 8), 0.00258999)
\ No newline at end of file
+        self.assertEqual(round(values[0], 8), 0.00258999)
+
+    def test_bar_store_windows(self):
+        s = 'ALL_UP'
+        events_queue = queue.Queue(100)
+        data = HistoricCSVDataHandler(
+            events_queue,
+            './tests/datasets',
+            [s],
+            ['open', 'high', 'low', 'close']
+        )
+
+        self.assertEqual(len(data.get_latest_bars_values(s, 'close', N=3)), 0)
+
+        for _ in range(3):
+            data.update_bars()
+
+        self.assertEqual(list(data.get_latest_bars_values(s, 'close', N=10)), [10.0, 20.0, 30.0])
+        self.assertEqual(list(data.get_latest_bars_values(s, 'close', N=2)), [20.0, 30.0])
+        self.assertEqual(list(data.get_latest_bars_values(s, 'timestamp', N=2)), [1492875300, 1492875600])
+
+        bars = data.get_latest_bars(s, N=2)
+        self.assertEqual([b.close for b in bars], [20.0, 30.0])
+        self.assertEqual(bars[-1].to_dict()['close'], 30.0)
+        self.assertEqual(bars[-1].symbol, s)
+
+    def test_bar_cache(self):
+        csv_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, csv_dir)
+        fname = os.path.join(csv_dir, 'ALL_UP.csv')
+        shutil.copy('./tests/datasets/ALL_UP.csv', fname)
+
+        timestamps, columns = load_bars(fname)
+        self.assertTrue(os.path.exists(fname + '.npy'))
+        self.assertEqual(list(columns['close']), [10.0, 20.0, 30.0, 5.0, 50.0])
+
+        timestamps, columns = load_bars(fname, nrows=2)
+        self.assertIsInstance(columns['close'].base, np.memmap)
+        self.assertEqual(list(timestamps), [1492875000, 1492875300])
+
+        with open(fname, 'a') as f:
+            f.write('1492876500,60,60,60,60\n')
+        timestamps, columns = load_bars(fname)
+        self.assertEqual(list(columns['close']), [10.0, 20.0, 30.0, 5.0, 50.0, 60.0])
+
+        data = HistoricCSVDataHandler(queue.Queue(), csv_dir, ['ALL_UP'], ['close'], cache=False)
+        self.assertEqual(list(data.bar_store.get_values('ALL_UP', 'close')), [10.0, 20.0, 30.0, 5.0, 50.0, 60.0])
+
+    def test_bar_cache_not_writable(self):
+        csv_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, csv_dir)
+        fname = os.path.join(csv_dir, 'ALL_UP.csv')
+        shutil.copy('./tests/datasets/ALL_UP.csv', fname)
+
+        with patch.object(os, 'replace', side_effect=OSError(30, 'Read-only file system')):
+            timestamps, columns = load_bars(fname, start=1492875300, nrows=2)
+        self.assertEqual(list(timestamps), [1492875300, 1492875600])
+        self.assertEqual(list(columns['close']), [20.0, 30.0])
+        self.assertEqual(os.listdir(csv_dir), ['ALL_UP.csv'])
+
+    def test_unsorted_bars(self):
+        csv_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, csv_dir)
+        fname = os.path.join(csv_dir, 'A.csv')
+        with open(fname, 'w') as f:
+            f.write('datetime,close\n600,3.0\n0,1.0\n300,2.0\n')
+
+        for cache in (False, True):
+            timestamps, columns = load_bars(fname, cache=cache)
+            self.assertEqual(list(timestamps), [0, 300, 600])
+            self.assertEqual(list(columns['close']), [1.0, 2.0, 3.0])
+
+    def write_offset_symbols(self):
+        csv_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, csv_dir)
+        for s, rows in (('A', [(0, 1.0), (300, 2.0), (600, 3.0)]),
+                        ('B', [(300, 10.0), (450, 20.0), (900, 30.0)])):
+            with open(os.path.join(csv_dir, '%s.csv' % s), 'w') as f:
+                f.write('datetime,open,close,high,low\n')
+                for t, p in rows:
+                    f.write('%d,%s,%s,%s,%s\n' % (t, p, p, p, p))
+        return csv_dir
+
+    def test_merged_data_handler(self):
+        events_queue = queue.Queue()
+        data = MergedCSVDataHandler(events_queue, self.write_offset_symbols(), ['A', 'B'], ['close'])
+
+        ticks = []
+        while data.continue_backtest:
+            data.update_bars()
+            event = events_queue.get(False)
+            ticks.append((data.get_latest_timestamp(), sorted(event.market_data),
+                          list(data.get_latest_bars_values('A', 'close')),
+                          list(data.get_latest_bars_values('B', 'close'))))
+
+        self.assertEqual(ticks, [
+            (0, ['A'], [1.0], []),
+            (300, ['A', 'B'], [2.0], [10.0]),
+            (450, ['B'], [2.0], [20.0]),
+            (600, ['A'], [3.0], [20.0]),
+            (900, ['B'], [3.0], [30.0]),
+        ])
+        self.assertTrue(events_queue.empty())
+
+    def test_lockstep_data_handler_union(self):
+        data = HistoricCSVDataHandler(queue.Queue(), self.write_offset_symbols(), ['A', 'B'], ['close'])
+
+        # The timeline starts at B's first bar, so no symbol is ever NaN
+        self.assertEqual(list(data.bar_store.get_values('A', 'timestamp')), [300, 450, 600, 900])
+        self.assertEqual(list(data.bar_store.get_values('A', 'close')), [2.0, 2.0, 3.0, 3.0])
+        self.assertEqual(list(data.bar_store.get_values('B', 'close')), [10.0, 20.0, 20.0, 30.0])
+
+    def test_date_bounds(self):
+        fname = './tests/datasets/BTC_ETC.csv'
+        start, end = 1492875300 + 300 * 1000, 1492875300 + 300 * 1100
+        expected, expected_columns = load_bars(fname, cache=False)
+        keep = (expected >= start) & (expected <= end)
+
+        # Small chunks so bounded CSV reading crosses chunk boundaries
+        chunksize = patch.object(sys.modules[load_bars.__module__], 'CSV_CHUNKSIZE', 256)
+        for cache in (True, False):
+            with chunksize:
+                timestamps, columns = load_bars(fname, cache=cache, start=start, end=end)
+            self.assertEqual(list(timestamps), list(expected[keep]))
+            self.assertEqual(list(columns['close']), list(expected_columns['close'][keep]))
+
+            with chunksize:
+                timestamps, columns = load_bars(fname, cache=cache, start=start, nrows=5)
+            self.assertEqual(list(timestamps), list(expected[expected >= start][:5]))
+
+        data = HistoricCSVDataHandler(
+            queue.Queue(),
+            './tests/datasets',
+            ['BTC_ETC'],
+            ['close'],
+            start_date=datetime.fromtimestamp(start),
+            end_date=datetime.fromtimestamp(end)
+        )
+        data.update_bars()
+        self.assertEqual(data.get_latest_datetime(), datetime.fromtimestamp(start))
+        self.assertEqual(len(data.bar_store.get_values('BTC_ETC', 'close')), keep.sum())
+
+    def test_ring_buffer_history(self):
+        store = BarStore(['A', 'B'], depth={'A': 5})
+        for t in range(12):
+            store.append('A', 100 + t, {'close': float(t)})
+            store.append('B', 100 + t, {'close': float(t)})
+            window = store.get_latest_values('A', 'close', 5)
+            self.assertEqual(list(window), [float(i) for i in range(max(t - 4, 0), t + 1)])
+            self.assertTrue(np.shares_memory(window, store.columns['A']['close']))
+            self.assertEqual(store.get_latest_bar('A').close, float(t))
+
+        # Fixed memory for A, unbounded history for B
+        self.assertEqual(len(store.timestamps['A']), 10)
+        self.assertEqual(list(store.get_latest_values('A', 'timestamp', 100)), list(range(107, 112)))
+        self.assertEqual(list(store.get_values('A', 'close')), [7.0, 8.0, 9.0, 10.0, 11.0])
+        self.assertEqual([b.close for b in store.get_latest_bars('A', 3)], [9.0, 10.0, 11.0])
+        self.assertEqual(len(store.get_latest_values('B', 'close', 100)), 12)
+
+        store.append('A', 112, {'close': 12.0, 'volume': 1.0})
+        store.append('A', 113, {'close': 13.0})
+        self.assertTrue(np.isnan(store.get_latest_values('A', 'volume', 5)[[0, 1, 2, 4]]).all())
+        self.assertEqual(store.get_latest_values('A', 'volume', 2)[0], 1.0)
+
+    def test_history_depth(self):
+        data = HistoricCSVDataHandler(queue.Queue(), './tests/datasets', ['BTC_ETC'], ['close'], limit=200,
+                                      history_depth=50)
+        for _ in range(100):
+            data.update_bars()
+        closes = data.get_latest_bars_values('BTC_ETC', 'close', N=1000)
+        self.assertEqual(len(closes), 50)
+        self.assertEqual(list(closes), list(data.get_all_bars_values('BTC_ETC', 'close')[50:100]))
@@ -2,12 +2,28 @@ import queue
 
 from datetime import datetime
 
+import numpy as np
+
 from unittest import TestCase
-from execution import SimulatedExecutionHandler
-from data import HistoricCSVDataHandler
-from portfolio import NaivePortfolio
+from mikasa.execution import SimulatedExecutionHandler
+from mikasa.fill import (CloseFillModel, FixedSlippage, IntrabarFillModel, NextBarOpenFillModel, OrderBook,
+                         ProportionalSlippage)
+from mikasa.data import HistoricCSVDataHandler
+from mikasa.portfolio import NaivePortfolio
+
+from mikasa.event import OrderEvent
+
+
+class BarsPortfolio(object):
+    def __init__(self, bars=None):
+        self.bars = bars
 
-from event import OrderEvent
+
+def drain(events_queue):
+    events = []
+    while not events_queue.empty():
+        events.append(events_queue.get(False))
+    return events
 
 
 class ExecutionTestCase(TestCase):
@@ -53,7 +69,123 @@ class ExecutionTestCase(TestCase):
         bars.update_bars()
         ee = events_queue.get(False)
         e.check_stop_orders(ee)
+        p.update_fill(events_queue.get(False))
         p.update_timeindex(ee)
 
         p.create_equity_curve_dataframe()
         self.assertEqual(p.equity_curve['equity_curve'][-1], 1.0001020000000001)
+
+    def test_execution_stop_order_book(self):
+        events_queue = queue.Queue(100)
+        bars = HistoricCSVDataHandler(events_queue, './tests/datasets/', ['BTC_ETC', 'BTC_LTC'], ['close'])
+        e = SimulatedExecutionHandler(events_queue, portfolio=BarsPortfolio())
+
+        bars.update_bars()
+        event = events_queue.get(False)
+        close = event.market_data['BTC_ETC'].close
+
+        orders = [
+            OrderEvent('BTC_ETC', 'STP', 1.0, 'BUY', close * 0.9),
+            OrderEvent('BTC_ETC', 'STP', 2.0, 'BUY', close * 0.8),
+            OrderEvent('BTC_ETC', 'STP', 3.0, 'BUY', close * 1.1),
+            OrderEvent('BTC_ETC', 'STP', 4.0, 'SELL', close * 1.2),
+            OrderEvent('BTC_ETC', 'STP', 5.0, 'SELL', close * 0.9),
+            OrderEvent('BTC_LTC', 'STP', 6.0, 'BUY', event.market_data['BTC_LTC'].close * 1.1),
+        ]
+        for order in orders:
+            e.execute_order(order)
+        self.assertEqual(e.stop_orders, orders)
+
+        # Every crossed order fills, including consecutive ones on the same symbol
+        e.check_stop_orders(event)
+        self.assertEqual(sorted(f.quantity for f in drain(events_queue)), [1.0, 2.0, 4.0])
+        self.assertEqual(e.stop_orders, [orders[2], orders[4], orders[5]])
+
+    def _order_book(self):
+        book = OrderBook(['A', 'B'])
+        book.add(OrderEvent('A', 'MKT', 1.0, 'BUY'))
+        book.add(OrderEvent('A', 'STP', 2.0, 'BUY', 10.5))
+        book.add(OrderEvent('A', 'STP', 3.0, 'SELL', 9.5))
+        book.add(OrderEvent('B', 'STP', 4.0, 'BUY', 21.0))
+        book.merge()
+        bars = {
+            'open': np.array([10.0, 10.0, 10.0, 22.0]),
+            'high': np.array([11.0, 11.0, 11.0, 23.0]),
+            'low': np.array([9.8, 9.8, 9.8, 21.5]),
+            'close': np.array([10.6, 10.6, 10.6, 22.5]),
+            'volume': np.array([2.5, 2.5, 2.5, 100.0]),
+        }
+        return book, bars
+
+    def test_fill_models(self):
+        book, bars = self._order_book()
+
+        quantities, prices = CloseFillModel().fill(book, bars)
+        self.assertEqual(list(quantities), [1.0, 2.0, 0.0, 4.0])
+        self.assertEqual(list(prices[quantities > 0]), [10.6, 10.5, 21.0])
+
+        quantities, prices = NextBarOpenFillModel().fill(book, bars)
+        self.assertEqual(list(quantities), [1.0, 0.0, 0.0, 4.0])
+        self.assertEqual(list(prices[quantities > 0]), [10.0, 22.0])
+
+        # The B stop gaps through at the open
+        quantities, prices = IntrabarFillModel().fill(book, bars)
+        self.assertEqual(list(quantities), [1.0, 2.0, 0.0, 4.0])
+        self.assertEqual(list(prices[quantities > 0]), [10.0, 10.5, 22.0])
+
+    def test_fill_model_slippage_and_volume_limit(self):
+        book, bars = self._order_book()
+
+        quantities, prices = IntrabarFillModel(slippage=ProportionalSlippage(0.01), volume_limit=1.0).fill(book, bars)
+        self.assertEqual(list(quantities), [1.0, 1.5, 0.0, 4.0])
+        self.assertAlmostEqual(prices[0], 10.1)
+        self.assertAlmostEqual(prices[2], 9.5 * 0.99)
+
+        _, prices = CloseFillModel(slippage=FixedSlippage(0.1)).fill(book, bars)
+        np.testing.assert_allclose(prices, [10.7, 10.6, 9.4, 21.1])
+
+    def test_fill_model_volume_limit_without_volume(self):
+        book, bars = self._order_book()
+        bars['volume'] = np.array([np.nan, np.nan, np.nan, 1.0])
+        quantities, _ = IntrabarFillModel(volume_limit=0.5).fill(book, bars)
+        self.assertEqual(list(quantities), [1.0, 2.0, 0.0, 0.5])
+
+    def test_execution_fill_model(self):
+        events_queue = queue.Queue(100)
+        bars = HistoricCSVDataHandler(events_queue, './tests/datasets/', ['BTC_ETC', 'BTC_LTC'],
+                                      ['open', 'high', 'low', 'close'])
+        e = SimulatedExecutionHandler(events_queue, portfolio=BarsPortfolio(bars), fill_model=IntrabarFillModel())
+
+        bars.update_bars()
+        e.check_stop_orders(events_queue.get(False))
+        e.execute_order(OrderEvent('BTC_ETC', 'MKT', 2.0, 'BUY'))
+        e.execute_order(OrderEvent('BTC_LTC', 'STP', 1.0, 'BUY', 1.0))
+        self.assertTrue(events_queue.empty())
+        self.assertEqual(len(e.order_book), 2)
+
+        # The market order fills at the open of the next bar, the stop rests
+        bars.update_bars()
+        e.check_stop_orders(events_queue.get(False))
+        fills = drain(events_queue)
+        self.assertEqual(len(fills), 1)
+        fill = fills[0]
+        self.assertEqual((fill.symbol, fill.quantity, fill.direction), ('BTC_ETC', 2.0, 'BUY'))
+        self.assertEqual(fill.price, bars.get_latest_bars_values('BTC_ETC', 'open')[-1])
+        self.assertEqual(fill.timeindex, bars.get_latest_datetime())
+        self.assertEqual([o.symbol for o in e.order_book.orders], ['BTC_LTC'])
+
+    def test_execution_fill_model_volume_limit_without_volume(self):
+        # The CSV datasets have no volume column, so nothing caps the fill
+        events_queue = queue.Queue(100)
+        bars = HistoricCSVDataHandler(events_queue, './tests/datasets/', ['BTC_ETC', ],
+                                      ['open', 'high', 'low', 'close'])
+        e = SimulatedExecutionHandler(events_queue, portfolio=BarsPortfolio(bars),
+                                      fill_model=IntrabarFillModel(volume_limit=0.5))
+
+        bars.update_bars()
+        e.check_stop_orders(events_queue.get(False))
+        e.execute_order(OrderEvent('BTC_ETC', 'MKT', 2.0, 'BUY'))
+        bars.update_bars()
+        e.check_stop_orders(events_queue.get(False))
+        self.assertEqual([f.quantity for f in drain(events_queue)], [2.0])
+        self.assertEqual(len(e.order_book), 0)
@@ -0,0 +1,73 @@
+from unittest import TestCase
+
+import numpy as np
+
+from mikasa.data import HistoricCSVDataHandler
+from mikasa.event import DequeEventBus, FillEvent
+from mikasa.fees import DAY, POLONIEX_TIERS, ExchangeFeeSchedule, FlatFee, MakerTakerFee, TieredFee
+from mikasa.portfolio import NaivePortfolio
+
+
+class FeesTestCase(TestCase):
+    def test_maker_taker(self):
+        rates = MakerTakerFee(0.001, 0.002).rates(0, np.ones(3), np.array([True, False, True]), None)
+        self.assertEqual(list(rates), [0.001, 0.002, 0.001])
+
+    def test_tiered(self):
+        fees = TieredFee([(0.0, 0.002, 0.003), (100.0, 0.001, 0.002)], window=30 * DAY)
+        maker = np.array([True, False])
+
+        self.assertEqual(list(fees.rates(0, np.array([60.0, 50.0]), maker, None)), [0.002, 0.003])
+        # 110 traded over the last 30 days
+        self.assertEqual(list(fees.rates(10 * DAY, np.array([1.0, 1.0]), maker, None)), [0.001, 0.002])
+        # The first batch has expired, 2 left
+        self.assertEqual(list(fees.rates(30 * DAY, np.array([1.0, 1.0]), maker, None)), [0.002, 0.003])
+        self.assertEqual(fees.trailing_volume(30 * DAY), 4.0)
+        self.assertEqual(fees.trailing_volume(60 * DAY), 0.0)
+
+    def test_exchange_schedule(self):
+        fees = ExchangeFeeSchedule({'POLONIEX': TieredFee(POLONIEX_TIERS)}, default=FlatFee(0.01))
+        rates = fees.rates(0, np.array([1.0, 1.0, 1.0]), np.array([True, False, False]),
+                           np.array(['POLONIEX', 'POLONIEX', 'BACKTEST'], dtype=object))
+        self.assertEqual(list(rates), [0.0015, 0.0025, 0.01])
+
+    def test_portfolio_fee_schedule(self):
+        bars = HistoricCSVDataHandler(DequeEventBus(), './tests/datasets/', ['BTC_ETC', 'BTC_LTC'], ['close'])
+        bars.update_bars()
+        p = NaivePortfolio(bars, bars.events, None, 1000.0, fee_schedule=MakerTakerFee(0.001, 0.002))
+
+        fills = [
+            FillEvent(None, 'BTC_ETC', 'BACKTEST', 100.0, 'BUY', 0.5),
+            FillEvent(None, 'BTC_LTC', 'BACKTEST', 10.0, 'BUY', 2.0, maker=True),
+            FillEvent(None, 'BTC_ETC', 'BACKTEST', 40.0, 'SELL', 0.6),
+        ]
+        p.update_fills(fills)
+
+        self.assertEqual([f.commission for f in fills], [0.002, 0.001, 0.002])
+        self.assertEqual(p.current_positions, {'BTC_ETC': 60.0, 'BTC_LTC': 10.0})
+        self.assertAlmostEqual(p.current_holdings['BTC_ETC'], 50.0 - 24.0)
+        self.assertAlmostEqual(p.current_holdings['BTC_LTC'], 20.0)
+        commission = 0.002 * 50.0 + 0.001 * 20.0 + 0.002 * 24.0
+        self.assertAlmostEqual(p.current_holdings['commission'], commission)
+        self.assertAlmostEqual(p.current_holdings['cash'], 1000.0 - 46.0 - commission)
+        self.assertAlmostEqual(p.current_holdings['total'], 1000.0 - 46.0 - commission)
+
+        # A single fill goes through the same schedule
+        p.update_fill(FillEvent(None, 'BTC_LTC', 'BACKTEST', 10.0, 'SELL', 2.0))
+        self.assertEqual(p.current_positions['BTC_LTC'], 0.0)
+        self.assertAlmostEqual(p.current_holdings['commission'], commission + 0.04)
+
+    def test_flat_fee_charges_both_sides(self):
+        bars = HistoricCSVDataHandler(DequeEventBus(), './tests/datasets/', ['BTC_ETC'], ['close'])
+        bars.update_bars()
+        commissions = []
+        for fee_schedule in (None, FlatFee()):
+            p = NaivePortfolio(bars, bars.events, None, 1000.0, fee_schedule=fee_schedule)
+            p.update_fills([FillEvent(None, 'BTC_ETC', 'BACKTEST', 100.0, 'BUY', 0.5),
+                            FillEvent(None, 'BTC_ETC', 'BACKTEST', 100.0, 'SELL', 0.5)])
+            commissions.append(p.current_holdings['commission'])
+
+        # The default commission is signed and the sell refunds the buy,
+        # FlatFee charges the notional of both
+        self.assertAlmostEqual(commissions[0], 0.0)
+        self.assertAlmostEqual(commissions[1], 2 * 0.002 * 50.0)
@@ -0,0 +1,83 @@
+import os
+import sys
+
+import numpy as np
+
+from unittest import TestCase
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'examples'))
+
+from helper import make_windows, normalize_windows, predict_seq_mul, rollout, window_batches
+
+
+def loop_windows(data, seq_len, norm_win):
+    # Windowing as load_data() did it before make_windows()
+    sequence_length = seq_len + 1
+    out = []
+    for i in range(len(data) - sequence_length):
+        out.append(data[i: i + sequence_length])
+    if norm_win:
+        out = [[((float(p) / float(w[0])) - 1) for p in w] for w in out]
+    return np.array(out)
+
+
+def loop_predict_seq_mul(model, data, win_size, pred_len):
+    # predict_seq_mul() as it was before rollout()
+    pred_seq = []
+    for i in range(len(data) // pred_len):
+        current = data[i * pred_len]
+        predicted = []
+        for j in range(pred_len):
+            predicted.append(model.predict(current[None, :, :])[0, 0])
+            current = current[1:]
+            current = np.insert(current, [win_size - 1], predicted[-1], axis=0)
+        pred_seq.append(predicted)
+    return pred_seq
+
+
+class WeightedModel(object):
+    """
+    Stands in for a keras model: a fixed weighted sum of the window.
+    """
+    def predict(self, X):
+        weights = np.linspace(0.5, 1.5, X.shape[1]) / X.shape[1]
+        return np.tensordot(X[:, :, 0], weights, axes=1)[:, None]
+
+
+class HelperTestCase(TestCase):
+    def setUp(self):
+        self.data = 10.0 + np.cumsum(np.random.RandomState(7).normal(size=40))
+
+    def test_make_windows(self):
+        for norm_win in (False, True):
+            windows = make_windows(self.data, 5)
+            if norm_win:
+                windows = normalize_windows(windows)
+            np.testing.assert_allclose(windows, loop_windows(self.data, 5, norm_win), rtol=0, atol=1e-12)
+
+    def test_window_batches(self):
+        expected = loop_windows(self.data, 5, True)
+        batches = list(window_batches(self.data, 5, batch_size=8))
+        self.assertEqual([len(X) for X, Y in batches], [8, 8, 8, 8, 2])
+
+        X = np.concatenate([X for X, Y in batches])
+        Y = np.concatenate([Y for X, Y in batches])
+        self.assertEqual(X.shape, (len(expected), 5, 1))
+        np.testing.assert_allclose(X[:, :, 0], expected[:, :-1], rtol=0, atol=1e-12)
+        np.testing.assert_allclose(Y, expected[:, -1], rtol=0, atol=1e-12)
+
+        # Shuffled batches hold the same windows
+        np.random.seed(0)
+        X = np.concatenate([X for X, Y in window_batches(self.data, 5, batch_size=8, shuffle=True)])
+        np.testing.assert_allclose(np.sort(X[:, 0, 0]), np.sort(expected[:, 0]), rtol=0, atol=1e-12)
+
+    def test_rollout(self):
+        model = WeightedModel()
+        windows = loop_windows(self.data, 6, True)[:, :-1, None]
+        for pred_len in (1, 3, 4):
+            expected = loop_predict_seq_mul(model, windows, 6, pred_len)
+            np.testing.assert_allclose(predict_seq_mul(model, windows, 6, pred_len), expected,
+                                       rtol=0, atol=1e-12)
+
+        starts = windows[::3]
+        self.assertEqual(rollout(model, starts, 3).shape, (len(starts), 3))
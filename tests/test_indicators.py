@@ -0,0 +1,111 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from mikasa.data import HistoricCSVDataHandler
+from mikasa.event import DequeEventBus
+from mikasa.indicators import (EMA, SMA, RollingMax, RollingMin, RollingOLS, RollingVariance, RollingZScore,
+                               rolling_ols_beta)
+from mikasa.strategy import StatArbitrageStrategy
+
+
+class IndicatorsTestCase(TestCase):
+    def setUp(self):
+        np.random.seed(7)
+        self.x = 1.0 + np.random.random(300)
+        self.y = 2.0 * self.x + np.random.normal(0.0, 0.1, 300)
+
+    def test_rolling_ols(self):
+        ols = RollingOLS(50)
+        ols_intercept = RollingOLS(50, fit_intercept=True)
+        for i in range(len(self.x)):
+            ols.update(self.x[i], self.y[i])
+            ols_intercept.update(self.x[i], self.y[i])
+            self.assertEqual(ols.ready, i >= 49)
+            if ols.ready:
+                x, y = self.x[i - 49:i + 1], self.y[i - 49:i + 1]
+                beta = np.linalg.lstsq(x[:, None], y, rcond=None)[0][0]
+                self.assertAlmostEqual(ols.beta, beta, places=10)
+
+                (beta, alpha), _, _, _ = np.linalg.lstsq(np.column_stack([x, np.ones(50)]), y, rcond=None)
+                self.assertAlmostEqual(ols_intercept.beta, beta, places=10)
+                self.assertAlmostEqual(ols_intercept.alpha, alpha, places=10)
+
+    def test_rolling_ols_beta(self):
+        x, y = 100.0 + self.x, 50.0 + self.y
+        window = 40
+        expected = []
+        expected_intercept = []
+        for i in range(len(x) - window + 1):
+            _x, _y = x[i:i + window], y[i:i + window]
+            expected.append(np.linalg.lstsq(_x[:, None], _y, rcond=None)[0][0])
+            expected_intercept.append(np.linalg.lstsq(np.column_stack([_x, np.ones(window)]), _y, rcond=None)[0][0])
+
+        np.testing.assert_allclose(rolling_ols_beta(x, y, window), expected, rtol=1e-9)
+        np.testing.assert_allclose(rolling_ols_beta(x, y, window, fit_intercept=True), expected_intercept, rtol=1e-7)
+        self.assertEqual(len(rolling_ols_beta(x[:10], y[:10], window)), 0)
+
+    def test_rolling_zscore(self):
+        zscore = RollingZScore(30)
+        values = 1000.0 + self.y
+        for i, v in enumerate(values):
+            zscore.update(v)
+            if zscore.ready:
+                window = values[i - 29:i + 1]
+                self.assertAlmostEqual(zscore.value, (v - window.mean()) / window.std(), places=6)
+
+    def test_streaming_indicators(self):
+        values = pd.Series(1000.0 + self.y)
+        expected = {
+            SMA(20): values.rolling(20).mean(),
+            EMA(20): values.ewm(span=20, adjust=False).mean(),
+            RollingVariance(20): values.rolling(20).var(ddof=0),
+            RollingVariance(20, ddof=1): values.rolling(20).var(),
+            RollingMax(20): values.rolling(20).max(),
+            RollingMin(20): values.rolling(20).min(),
+        }
+        for i, v in enumerate(values):
+            for indicator, series in expected.items():
+                indicator.update(v)
+                self.assertEqual(indicator.ready, i >= 19)
+                if indicator.ready:
+                    self.assertAlmostEqual(indicator.value, series[i], places=6)
+
+    def test_register_indicator(self):
+        bars = HistoricCSVDataHandler(DequeEventBus(), './tests/datasets/', ['BTC_ETC'], ['close'], limit=100)
+        for _ in range(30):
+            bars.update_bars()
+
+        # Registered late, caught up on the bars already streamed
+        sma = bars.register_indicator('BTC_ETC', SMA, period=10)
+        self.assertIs(bars.register_indicator('BTC_ETC', SMA, period=10), sma)
+        self.assertIsNot(bars.register_indicator('BTC_ETC', SMA, period=20), sma)
+        self.assertIsNot(bars.register_indicator('BTC_ETC', SMA, field='open', period=10), sma)
+
+        while bars.continue_backtest:
+            bars.update_bars()
+            self.assertAlmostEqual(sma.value, bars.get_latest_bars_values('BTC_ETC', 'close', 10).mean(), places=12)
+
+    def test_stat_arbitrage_zscore(self):
+        look_back, window = 60, 40
+        bars = HistoricCSVDataHandler(DequeEventBus(), './tests/datasets/', ['BTC_ETC', 'BTC_LTC'], ['close'],
+                                      limit=200)
+        strategy = StatArbitrageStrategy(bars, bars.events, look_back=look_back, window=window)
+
+        for i in range(200):
+            bars.update_bars()
+            strategy.calculate_signals(bars.events.get())
+            while bars.events.poll() is not None:
+                pass
+            if i + 1 <= look_back:
+                continue
+
+            # Rolling OLS over the look-back as the batch implementation did it
+            x = pd.Series(bars.get_latest_bars_values('BTC_ETC', 'close', look_back))
+            y = pd.Series(bars.get_latest_bars_values('BTC_LTC', 'close', look_back))
+            beta = np.array([np.dot(x[j:j + window], y[j:j + window]) / np.dot(x[j:j + window], x[j:j + window])
+                             for j in range(look_back - window)])
+            spread = x[window:].values - beta * y[window:].values
+            expected = (spread[-1] - spread.mean()) / spread.std()
+            self.assertAlmostEqual(strategy.zscore, expected, places=6)
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import threading
+
+from unittest import TestCase
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+
+from mikasa.data import PoloniexDataHandler
+from mikasa.event import QueueEventBus
+
+PERIOD = 300
+NOW = 1500000000
+
+
+class StubPoloniex(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, bars):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StubPoloniexHandler)
+        self.bars = bars
+        self.requests = []
+        self.clients = set()
+        # The first poll only gets answered once every symbol has asked
+        self.barrier = threading.Barrier(len(bars), timeout=5)
+
+
+class StubPoloniexHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        query = dict((k, v[0]) for k, v in parse_qs(urlparse(self.path).query).items())
+        server.requests.append(query)
+        server.clients.add(self.client_address)
+        if len(server.requests) <= len(server.bars):
+            server.barrier.wait()
+
+        start, end = int(query['start']), int(query['end'])
+        bars = [b for b in server.bars[query['currencyPair']] if start <= b['date'] <= end]
+        body = json.dumps(bars or [{'date': 0}]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def bar(timestamp, close):
+    return {'date': timestamp, 'open': close, 'high': close, 'low': close, 'close': close, 'volume': 1.0}
+
+
+class PoloniexDataHandlerTestCase(TestCase):
+    def setUp(self):
+        self.server = StubPoloniex({
+            'BTC_ETH': [bar(NOW - 3 * PERIOD, 1.0), bar(NOW - 2 * PERIOD, 2.0), bar(NOW - PERIOD, 3.0),
+                        bar(NOW, 4.0)],
+            'BTC_LTC': [bar(NOW - 2 * PERIOD, 10.0), bar(NOW, 11.0)],
+        })
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        self.clock = [NOW + 10]
+        self.events = QueueEventBus()
+        self.data = PoloniexDataHandler(self.events, ['BTC_ETH', 'BTC_LTC'], PERIOD,
+                                        base_url='http://127.0.0.1:%d/public' % self.server.server_port,
+                                        lookback=2, clock=lambda: self.clock[0])
+
+    def tearDown(self):
+        self.data.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def drain(self):
+        events = []
+        event = self.events.poll()
+        while event is not None:
+            events.append(event)
+            event = self.events.poll()
+        return events
+
+    def test_poll(self):
+        self.data.update_bars()
+
+        # Both symbols fetched concurrently, the forming bar at NOW left out
+        events = self.drain()
+        self.assertEqual([sorted(e.market_data) for e in events], [['BTC_ETH', 'BTC_LTC'], ['BTC_ETH']])
+        self.assertEqual(self.data.get_latest_timestamp(), NOW - PERIOD)
+        self.assertEqual(list(self.data.get_latest_bars_values('BTC_ETH', 'close', 5)), [2.0, 3.0])
+        self.assertEqual(list(self.data.get_latest_bars_values('BTC_LTC', 'close', 5)), [10.0])
+        self.assertEqual([r['start'] for r in self.server.requests], [str(NOW + 10 - 3 * PERIOD)] * 2)
+
+        # Next poll asks only for the bars after the last one seen
+        self.clock[0] = NOW + PERIOD + 10
+        self.data.update_bars()
+        events = self.drain()
+        self.assertEqual([sorted(e.market_data) for e in events], [['BTC_ETH', 'BTC_LTC']])
+        self.assertEqual(events[0].market_data['BTC_LTC'].close, 11.0)
+        self.assertEqual(sorted(r['start'] for r in self.server.requests[2:]),
+                         [str(NOW - 2 * PERIOD + 1), str(NOW - PERIOD + 1)])
+
+        # Nothing new: no events, and the pooled connections are reused
+        self.data.update_bars()
+        self.assertEqual(self.drain(), [])
+        self.assertEqual(len(self.server.requests), 6)
+        self.assertEqual(len(self.server.clients), 2)
+
+    def test_poll_in_running_loop(self):
+        async def run():
+            return await self.data.poll()
+
+        # Awaited from an application's own event loop
+        self.assertEqual(asyncio.run(run()), 2)
+
+    def test_no_symbols(self):
+        with self.assertRaises(ValueError):
+            PoloniexDataHandler(QueueEventBus(), [], PERIOD)
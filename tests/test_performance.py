@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from mikasa.performance import (create_drawdowns, create_drawdown_series, create_worst_drawdown,
+                                create_sharpe_ratio, OnlinePerformance)
+
+
+def loop_drawdowns(equity_curve):
+    hwm = [0]
+    drawdown = pd.Series(np.nan, index=equity_curve.index)
+    duration = pd.Series(np.nan, index=equity_curve.index)
+    for t in range(1, len(equity_curve)):
+        hwm.append(max(hwm[t - 1], equity_curve.iloc[t]))
+        drawdown.iloc[t] = hwm[t] - equity_curve.iloc[t]
+        duration.iloc[t] = 0 if drawdown.iloc[t] == 0 else duration.iloc[t - 1] + 1
+    return drawdown, duration
+
+
+class PerformanceTestCase(TestCase):
+    def setUp(self):
+        np.random.seed(7)
+        index = pd.date_range('2017-04-22', periods=2000, freq='5min')
+        returns = np.random.normal(0.0, 0.01, len(index))
+        returns[0] = np.nan
+        self.equity_curve = pd.Series((1.0 + np.nan_to_num(returns)).cumprod(), index=index)
+        self.equity_curve.iloc[0] = np.nan
+
+    def test_drawdowns_match_loop(self):
+        drawdown, duration = create_drawdown_series(self.equity_curve)
+        expected_drawdown, expected_duration = loop_drawdowns(self.equity_curve)
+
+        np.testing.assert_allclose(drawdown.values, expected_drawdown.values)
+        np.testing.assert_array_equal(duration.values, expected_duration.values)
+        self.assertEqual(create_drawdowns(self.equity_curve),
+                         (expected_drawdown.max(), expected_duration.max()))
+
+    def test_worst_drawdown(self):
+        max_dd, start, end = create_worst_drawdown(self.equity_curve)
+        drawdown, _ = create_drawdown_series(self.equity_curve)
+
+        self.assertEqual(max_dd, drawdown.max())
+        self.assertEqual(drawdown[end], max_dd)
+        self.assertEqual(drawdown[start], 0)
+        self.assertEqual(self.equity_curve[start], self.equity_curve[:end].max())
+        self.assertTrue((drawdown[start:end].iloc[1:] > 0).all())
+
+    def test_no_drawdown(self):
+        equity_curve = pd.Series([np.nan, 1.0, 1.1, 1.2])
+        self.assertEqual(create_drawdowns(equity_curve), (0.0, 0.0))
+        self.assertEqual(create_worst_drawdown(equity_curve), (0.0, None, None))
+
+    def test_online_performance(self):
+        totals = 1000.0 * self.equity_curve.fillna(1.0)
+        performance = OnlinePerformance()
+        for total in totals:
+            performance.update(total)
+
+        returns = totals.pct_change()
+        equity_curve = (1.0 + returns).cumprod()
+        max_dd, dd_duration = create_drawdowns(equity_curve)
+
+        self.assertAlmostEqual(performance.total_return, equity_curve.iloc[-1] - 1.0)
+        self.assertAlmostEqual(performance.sharpe_ratio, create_sharpe_ratio(returns), places=6)
+        self.assertAlmostEqual(performance.max_drawdown, max_dd)
+        self.assertEqual(performance.max_duration, dd_duration)
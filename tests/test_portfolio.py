@@ -1,11 +1,13 @@
 import queue
 
+import numpy as np
+
 from unittest import TestCase
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from portfolio import NaivePortfolio
-from data import HistoricCSVDataHandler
-from event import FillEvent, SignalEvent
+from mikasa.portfolio import Ledger, NaivePortfolio
+from mikasa.data import HistoricCSVDataHandler
+from mikasa.event import FillEvent, SignalEvent
 
 
 class PortfolioTestCase(TestCase):
@@ -192,3 +194,18 @@ class PortfolioTestCase(TestCase):
             {'commission': 0.002, 'ALL_UP': 50.0, 'total': 1039.998,
                                'datetime': datetime(2017, 4, 22, 18, 50), 'cash': 989.99800000000005},
         ])
+
+    def test_ledger(self):
+        ledger = Ledger(['BTC_ETC', 'cash'])
+        rows = Ledger.CHUNK + 10
+        for i in range(rows):
+            ledger.append(datetime(2017, 4, 1) + timedelta(minutes=5 * i), [i, 1000.0 - i])
+
+        self.assertEqual(ledger.length, rows)
+        self.assertEqual(ledger.column('cash')[-1], 1000.0 - (rows - 1))
+
+        frame = ledger.to_frame()
+        self.assertEqual(len(frame), rows)
+        self.assertEqual(frame.index[-1], datetime(2017, 4, 1) + timedelta(minutes=5 * (rows - 1)))
+        self.assertTrue(np.shares_memory(frame['BTC_ETC'].values, ledger.data))
+        self.assertEqual(ledger.to_dicts()[1], {'datetime': datetime(2017, 4, 1, 0, 5), 'BTC_ETC': 1.0, 'cash': 999.0})
@@ -1,9 +1,36 @@
 import queue
 
+import numpy as np
+
 from unittest import TestCase
 
-from strategy import BuyAndHoldStrategy
-from data import HistoricCSVDataHandler
+from mikasa.strategy import BuyAndHoldStrategy, PredictionStrategy, signals_to_positions
+from mikasa.data import BarStore, HistoricCSVDataHandler
+from mikasa.event import DequeEventBus, MarketEvent
+
+
+class MomentumModel(object):
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        return X.sum(axis=1)
+
+
+class MomentumStrategy(PredictionStrategy):
+    window = 5
+
+    def __init__(self, bars, queue):
+        super(MomentumStrategy, self).__init__(bars, queue)
+        self.model = MomentumModel()
+        self.signals = []
+
+    def make_features(self, windows):
+        return np.diff(windows['close'], axis=1)
+
+    def on_prediction(self, symbol, dt, prediction):
+        self.signals.append((symbol, dt, prediction))
 
 
 class StrategyTestCase(TestCase):
@@ -25,3 +52,60 @@ class StrategyTestCase(TestCase):
         self.assertEqual(signal.symbol, 'BTC_ETC')
         self.assertEqual(signal.strategy_id, 'BUY_AND_HOLD')
         self.assertEqual(signal.signal_type, 'LONG')
+
+    def test_signals_to_positions(self):
+        nan = np.nan
+        signals = [nan, 1, nan, -1, 0, nan, -1, 1, nan, 0, 0, 1]
+        self.assertEqual(list(signals_to_positions(signals)),
+                         [0, 1, 1, 1, 0, 0, -1, -1, -1, 0, 0, 1])
+
+    def test_prediction_strategy(self):
+        signals = []
+        calls = []
+        for live in (False, True):
+            bars = HistoricCSVDataHandler(DequeEventBus(), './tests/datasets/', ['BTC_ETC', 'BTC_LTC'], ['close'],
+                                          limit=100)
+            bars.live = live
+            strategy = MomentumStrategy(bars, bars.events)
+            while bars.continue_backtest:
+                bars.update_bars()
+                strategy.calculate_signals(bars.events.get())
+            signals.append(strategy.signals)
+            calls.append(strategy.model.calls)
+
+        precomputed, live = signals
+        # One prediction per new bar of each symbol once the window is full
+        self.assertEqual(len(precomputed), 2 * (100 - 4))
+        self.assertEqual([s[:2] for s in precomputed], [s[:2] for s in live])
+        for a, b in zip(precomputed, live):
+            self.assertAlmostEqual(a[2], b[2], places=12)
+        # A single batch for the whole history, one per tick when live
+        self.assertEqual(calls, [1, 100 - 4])
+
+    def test_prediction_strategy_ring_buffer(self):
+        symbols = ['BTC_ETC', 'BTC_LTC']
+        runs = []
+        for depth in (None, 5):
+            bars = HistoricCSVDataHandler(DequeEventBus(), './tests/datasets/', symbols, ['close'],
+                                          limit=100, history_depth=depth)
+            source = bars.bar_store
+            # Feed the bars one by one as a live handler does
+            bars.bar_store = BarStore(symbols, depth=depth)
+            bars.live = True
+            strategy = MomentumStrategy(bars, bars.events)
+            for i in range(100):
+                for s in symbols:
+                    bars.bar_store.append(s, source.timestamps[s][i], {'close': source.columns[s]['close'][i]})
+                strategy.calculate_signals(MarketEvent(market_data={}))
+            runs.append(strategy.signals)
+
+        unbounded, ring = runs
+        self.assertEqual(len(ring), 2 * (100 - 4))
+        self.assertEqual([s[:2] for s in unbounded], [s[:2] for s in ring])
+        for a, b in zip(unbounded, ring):
+            self.assertAlmostEqual(a[2], b[2], places=12)
+
+        bars = HistoricCSVDataHandler(DequeEventBus(), './tests/datasets/', symbols, ['close'],
+                                      limit=100, history_depth=4)
+        with self.assertRaises(ValueError):
+            MomentumStrategy(bars, bars.events)
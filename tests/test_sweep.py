@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from unittest import TestCase
+
+from mikasa.backtest import VectorizedBacktest
+from mikasa.data import HistoricCSVDataHandler
+from mikasa.execution import SimulatedExecutionHandler
+from mikasa.performance import create_summary_values
+from mikasa.portfolio import VectorizedPortfolio
+from mikasa.strategy import SMAStrategy
+from mikasa.sweep import ParameterSweep
+
+
+class ParameterSweepTestCase(TestCase):
+    def setUp(self):
+        self.sweep = ParameterSweep(
+            './tests/datasets/',
+            ['BTC_ETC'],
+            1000.0,
+            datetime(2017, 4, 21, 0, 0, 1),
+            HistoricCSVDataHandler,
+            SimulatedExecutionHandler,
+            VectorizedPortfolio,
+            SMAStrategy,
+            fields=['open', 'high', 'low', 'close'],
+            ticks_limit=3000,
+            backtest=VectorizedBacktest,
+            max_workers=2
+        )
+
+    def test_grid(self):
+        self.assertEqual(self.sweep.grid({'b': [1, 2], 'a': [3]}), [{'a': 3, 'b': 1}, {'a': 3, 'b': 2}])
+
+    def test_sample(self):
+        params = self.sweep.sample({'period': [10, 20, 50]}, 5, seed=1)
+        self.assertEqual(len(params), 5)
+        self.assertTrue(all(p['period'] in (10, 20, 50) for p in params))
+        self.assertEqual(params, self.sweep.sample({'period': [10, 20, 50]}, 5, seed=1))
+
+    def test_run_grid(self):
+        results = self.sweep.run_grid({'period': [20, 50]})
+        self.assertEqual(list(results['period']), [20, 50])
+
+        backtest = VectorizedBacktest(
+            './tests/datasets/',
+            ['BTC_ETC'],
+            1000.0,
+            0.0,
+            datetime(2017, 4, 21, 0, 0, 1),
+            HistoricCSVDataHandler,
+            SimulatedExecutionHandler,
+            VectorizedPortfolio,
+            SMAStrategy,
+            fields=['open', 'high', 'low', 'close'],
+            ticks_limit=3000,
+            strategy_params={'period': 50}
+        )
+        backtest._run_backtest()
+        backtest.portfolio.create_equity_curve_dataframe()
+        self.assertEqual(dict(create_summary_values(backtest.portfolio.equity_curve)),
+                         dict((k, v) for k, v in results.iloc[1].items() if k != 'period'))
+
+    def test_results_sort_numerically(self):
+        results = self.sweep.run_grid({'period': [5, 10, 20, 50, 100]})
+        for column in ('Total Return', 'Sharpe Ratio', 'Max Drawdown', 'Drawdown Duration'):
+            self.assertEqual(results[column].dtype, float)
+            ranked = results.sort_values(column, ascending=False)[column].tolist()
+            self.assertEqual(ranked, sorted(results[column], reverse=True))
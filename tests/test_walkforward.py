@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from unittest import TestCase
+
+from mikasa.data import HistoricCSVDataHandler
+from mikasa.execution import SimulatedExecutionHandler
+from mikasa.portfolio import NaivePortfolio
+from mikasa.strategy import BuyAndHoldStrategy
+from mikasa.walkforward import WalkForward
+
+
+class FitBuyAndHoldStrategy(BuyAndHoldStrategy):
+    def fit(self, bars):
+        self.train_closes = bars.get_all_bars_values(self.symbol_list[0], 'close')
+        assert len(self.train_closes) == 1000
+
+
+class LegacyDataHandler(HistoricCSVDataHandler):
+    def __init__(self, events, csv_dir, symbol_list, fields, limit=None, bar_store=None):
+        super(LegacyDataHandler, self).__init__(events, csv_dir, symbol_list, fields, limit=limit,
+                                                bar_store=bar_store)
+
+
+class WalkForwardTestCase(TestCase):
+    def walk_forward(self, data_handler=HistoricCSVDataHandler, **params):
+        return WalkForward(
+            './tests/datasets/',
+            ['BTC_ETC'],
+            1000.0,
+            data_handler,
+            SimulatedExecutionHandler,
+            NaivePortfolio,
+            FitBuyAndHoldStrategy,
+            fields=['open', 'high', 'low', 'close'],
+            train_size=1000,
+            test_size=500,
+            ticks_limit=3000,
+            max_workers=2,
+            **params
+        )
+
+    def test_windows(self):
+        windows = self.walk_forward().windows()
+        self.assertEqual(len(windows), 4)
+        (train_start, train_end), (test_start, test_end) = windows[1]
+        self.assertEqual(train_end, test_start)
+        self.assertEqual((test_start - train_start) // 300, 1000)
+        self.assertEqual((test_end - test_start) // 300, 500)
+        self.assertEqual(windows[1][0][0] - windows[0][0][0], 500 * 300)
+
+        anchored = self.walk_forward(anchored=True).windows()
+        self.assertEqual(set(train[0] for train, _ in anchored), {windows[0][0][0]})
+
+    def test_run(self):
+        report = self.walk_forward().run()
+        self.assertEqual(len(report.windows), 4)
+        self.assertEqual(report.windows['test_start'].iloc[0], datetime.fromtimestamp(1492875000 + 1000 * 300))
+        self.assertEqual([k for k, _ in report.stats],
+                         ['Total Return', 'Sharpe Ratio', 'Max Drawdown', 'Drawdown Duration'])
+
+        # Windows meet without overlap, one row per bar
+        self.assertTrue(report.equity_curve.index.is_unique)
+        self.assertEqual(len(report.equity_curve), 4 * 500)
+        total = 1.0
+        for r in report.windows['Total Return']:
+            total *= 1.0 + r
+        self.assertAlmostEqual(report.equity_curve['equity_curve'].iloc[-1], total)
+
+    def test_handler_without_date_bounds(self):
+        report = self.walk_forward(data_handler=LegacyDataHandler).run()
+        self.assertEqual(len(report.windows), 4)